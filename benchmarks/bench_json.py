@@ -0,0 +1,68 @@
+"""
+Compare DRF's stdlib based JSON renderer and parser with the orjson based ones on a Dummy list.
+
+Usage: python benchmarks/bench_json.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from config.parsers import FastJSONParser  # noqa: E402
+from config.renderers import FastJSONRenderer, orjson  # noqa: E402
+from dummy_app.models import Dummy, DummyCategory  # noqa: E402
+from dummy_app.serializers import DummySerializer  # noqa: E402
+
+
+def build_payload(rows):
+    """ Serialized Dummy list built from unsaved instances, so no database is needed """
+
+    categories = [DummyCategory(id=i, label=f"Category {i}") for i in range(1, 51)]
+    objects = [
+        Dummy(id=i, label=f"Dummy {i}", description=f"Description of dummy n°{i} " * 8, category=categories[i % 50])
+        for i in range(1, rows + 1)
+    ]
+    return DummySerializer(objects, many=True, expand=['category']).data
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson is not installed, the fast renderer falls back to the standard library')
+
+    data = build_payload(args.rows)
+    content = JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data) == content, 'Renderers disagree'
+    assert FastJSONParser().parse(BytesIO(content)) == JSONParser().parse(BytesIO(content)), 'Parsers disagree'
+
+    print(f'{args.rows} rows, {len(content) / 1024:.0f} KiB, best of {args.repeat}')
+    for name, slow, fast in (
+        ('render', lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+        ('parse', lambda: JSONParser().parse(BytesIO(content)), lambda: FastJSONParser().parse(BytesIO(content))),
+    ):
+        slow_time, fast_time = best_of(slow, args.repeat), best_of(fast, args.repeat)
+        print(f'{name:>6}: json {slow_time * 1000:8.2f} ms | orjson {fast_time * 1000:8.2f} ms | x{slow_time / fast_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare `DummySerializer` with the `values_list()` based `DummyValuesSerializer` on a Dummy list read from an
+in-memory SQLite database, and `DummyCategoryStatsSerializer` with `DummyCategoryValuesSerializer` on as many
+categories.
+
+Usage: python benchmarks/bench_serializers.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+os.environ['DB_NAME'] = ':memory:'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from dummy_app.models import Dummy, DummyCategory  # noqa: E402
+from dummy_app.serializers import (  # noqa: E402
+    DummyCategoryStatsSerializer, DummyCategoryValuesSerializer, DummySerializer, DummyValuesSerializer,
+)
+
+
+def seed(rows):
+    with connection.schema_editor() as editor:
+        editor.create_model(DummyCategory)
+        editor.create_model(Dummy)
+
+    categories = DummyCategory.objects.bulk_create([DummyCategory(label=f"Category {i}") for i in range(rows)])
+    Dummy.objects.bulk_create(
+        (Dummy(label=f"Dummy {i}", description=f"Description {i} " * 8, category=categories[i % 50]) for i in range(rows)),
+        batch_size=5000,
+    )
+
+
+def compare(name, slow_serializer, fast_serializer, repeat):
+    assert slow_serializer() == fast_serializer(), 'Serializers disagree'
+    slow = min(timeit.repeat(slow_serializer, number=1, repeat=repeat))
+    fast = min(timeit.repeat(fast_serializer, number=1, repeat=repeat))
+    print(f'{name:<18} ModelSerializer {slow * 1000:8.1f} ms | values {fast * 1000:7.1f} ms | x{slow / fast:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    print(f'{args.rows} rows, best of {args.repeat}')
+
+    for expand in ([], ['category']):
+        queryset = Dummy.objects.order_by('id')
+        if expand:
+            queryset = queryset.select_related('category')
+
+        def model_serializer():
+            return DummySerializer(queryset.all(), many=True, expand=expand).data
+
+        def values_serializer():
+            serializer = DummyValuesSerializer(expand=expand)
+            return serializer.to_representation(serializer.get_queryset(queryset.all()))
+
+        compare(f'expand={",".join(expand) or "-"}', model_serializer, values_serializer, args.repeat)
+
+    categories = DummyCategory.objects.order_by('id')
+    category_serializer = DummyCategoryValuesSerializer()
+    compare(
+        'categories',
+        lambda: DummyCategoryStatsSerializer(categories.all(), many=True).data,
+        lambda: category_serializer.to_representation(category_serializer.get_queryset(categories.all())),
+        args.repeat,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure the overhead of the login throttles (per address and per email) with the configured cache backend.
+
+Usage: python benchmarks/bench_throttle.py [--requests 20000] [--budget-us 100]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from config.parsers import FastJSONParser  # noqa: E402
+from users.throttling import EmailThrottle, IPThrottle  # noqa: E402
+
+
+class View:
+    throttle_scope = 'login'
+
+
+def build_requests(count, distinct):
+    """ Parsed login requests, from `count` different addresses and emails when `distinct` """
+
+    factory = APIRequestFactory()
+    requests = []
+    for i in range(count):
+        n = i if distinct else 0
+        address = f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'
+        request = factory.post('/', {'email': f'user{n}@example.com'}, format='json', REMOTE_ADDR=address)
+        request = Request(request, parsers=[FastJSONParser()])
+        request.data  # Parsing is the view's cost, not the throttle's
+        requests.append(request)
+    return requests
+
+
+def per_request(requests):
+    start = time.perf_counter()
+    for request in requests:
+        for throttle_class in (IPThrottle, EmailThrottle):
+            throttle_class().allow_request(request, View)
+    return (time.perf_counter() - start) / len(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--budget-us', type=float, default=100)
+    args = parser.parse_args()
+
+    print(f"{settings.CACHES['default']['BACKEND']}, {args.requests} requests")
+    results = {}
+    with mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, {'login_ip': '5/min', 'login_email': '5/min'}):
+        cache.clear()
+        results['allowed'] = per_request(build_requests(args.requests, distinct=True))
+        # A single client over its limit, every request past the fifth one is rejected
+        cache.clear()
+        results['rejected'] = per_request(build_requests(args.requests, distinct=False))
+    cache.clear()
+
+    for name, elapsed in results.items():
+        verdict = 'ok' if elapsed * 1e6 <= args.budget_us else 'OVER BUDGET'
+        print(f'{name:>8}: {elapsed * 1e6:6.1f} µs per request ({verdict}, budget {args.budget_us:g} µs)')
+    sys.exit(any(elapsed * 1e6 > args.budget_us for elapsed in results.values()))
+
+
+if __name__ == '__main__':
+    main()
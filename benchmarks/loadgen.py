@@ -0,0 +1,134 @@
+"""
+Minimal asyncio HTTP/1.1 load generator: keeps N keep-alive connections busy for a while and reports the throughput
+and the latency percentiles. Standard library only.
+
+Compare the sync views under WSGI with the async ones under ASGI, same worker count, e.g.:
+
+    gunicorn config.wsgi -w 4 --threads 8 -b 127.0.0.1:8000
+    python benchmarks/loadgen.py http://localhost:8000/dummy_app/dummy/?page_size=20 --connections 1000
+
+    DUMMY_ASYNC_VIEWS=True uvicorn config.asgi:application --workers 4 --port 8000
+    python benchmarks/loadgen.py http://localhost:8000/dummy_app/dummy/?page_size=20 --connections 1000
+
+Neither side is expected to win everywhere: run both on the target hardware and database before switching.
+
+Opening 1000 connections needs `ulimit -n` above that on both ends. The Dummy responses are cached, add
+`--bust-cache` to send a different query string each time and measure the database path.
+"""
+import argparse
+import asyncio
+import json
+import time
+from itertools import count
+from statistics import quantiles
+from urllib.parse import urlsplit
+
+
+async def read_response(reader):
+    """ Read a response, returns its status code, headers and body """
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(':', 1) for line in lines[1:] if ':' in line)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = b''
+        while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+            body += (await reader.readexactly(size + 2))[:-2]
+        await reader.readuntil(b'\r\n')
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+class Connection:
+    """ Keep-alive HTTP/1.1 connection to a server, reopened when the server closes it """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.netloc = parts.hostname, parts.port or 80, parts.netloc
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """ Send a request, returns its status code, headers and body """
+
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        headers = {'Host': self.netloc, 'Accept': 'application/json', **(headers or {})}
+        if body is not None:
+            headers.setdefault('Content-Type', 'application/json')
+            headers['Content-Length'] = str(len(body))
+        head = f'{method} {path} HTTP/1.1\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+
+        try:
+            self.writer.write(head.encode() + b'\r\n' + (body or b''))
+            status, headers, body = await read_response(self.reader)
+        except BaseException:
+            self.close()
+            raise
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def worker(url, deadline, latencies, errors, sequence, bust_cache):
+    parts = urlsplit(url)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    connection = Connection(url)
+
+    while time.monotonic() < deadline:
+        target = path
+        if bust_cache:
+            target += ('&' if '?' in path else '?') + f'_={next(sequence)}'
+
+        start = time.perf_counter()
+        try:
+            status, _, _ = await connection.request('GET', target)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors['connection'] += 1
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors['http'] += 1
+
+    connection.close()
+
+
+async def run(url, connections, duration, bust_cache):
+    latencies, errors, sequence = [], {'http': 0, 'connection': 0}, count()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        worker(url, deadline, latencies, errors, sequence, bust_cache) for _ in range(connections)
+    ))
+
+    report = {'url': url, 'connections': connections, 'duration': duration, 'requests': len(latencies), **errors}
+    report['requests_per_second'] = round(len(latencies) / duration, 1)
+    if len(latencies) >= 2:
+        percentiles = quantiles(latencies, n=100)
+        for name, index in (('p50', 49), ('p95', 94), ('p99', 98)):
+            report[f'{name}_ms'] = round(percentiles[index] * 1000, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds')
+    parser.add_argument('--bust-cache', action='store_true', help='Make every query string unique')
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.url, args.connections, args.duration, args.bust_cache)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Benchmark harness for the auth and Dummy endpoints.
+
+Seeds users, categories and dummies in the database configured by the environment, then drives each scenario
+against a server running on that same database, at a fixed concurrency. Prints (or writes) p50/p95/p99 latencies
+and throughput per scenario as JSON, and compares them with a stored baseline: a scenario is flagged as a
+regression when its p95 latency grows, or its throughput drops, by more than the tolerance. The exit status is 1
+when a regression is found.
+
+    python manage.py runserver --noreload  # or gunicorn / uvicorn, see benchmarks/loadgen.py
+    python benchmarks/run.py --url http://localhost:8000 --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --url http://localhost:8000 --baseline benchmarks/baseline.json
+
+The rows of a run carry a `__bench_<run id>__` marker in their labels and emails and are deleted at the end, unless
+--keep is given (reuse them with --no-seed --run-id). The database must be empty of anything else, --allow-existing-data
+runs it next to other rows anyway, which it only ever selects by the exact marker.
+
+The signup and login scenarios are throttled by default, raise the THROTTLE_* rates of the server for the run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import secrets
+import sys
+import time
+from itertools import count
+from pathlib import Path
+from statistics import quantiles
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+from benchmarks.loadgen import Connection  # noqa: E402
+from dummy_app.bulk import delete_category  # noqa: E402
+from dummy_app.factories import create_categories, create_dummies  # noqa: E402
+from dummy_app.models import Dummy, DummyCategory  # noqa: E402
+from users.factories import create_users  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+from users.tokens import FastBlacklistRefreshToken  # noqa: E402
+
+PASSWORD = 'bench-password'
+MARKER = '__bench_{}__'
+RUN_PATTERN = r'^__bench_[0-9a-f]+__'
+SCENARIOS = ('signup', 'login', 'refresh', 'protected_list', 'bulk_post', 'delete')
+
+
+def marked(field, marker):
+    """ Filter on the rows whose `field` starts with `marker`, exact-case (`startswith` is not on SQLite) """
+
+    return {f'{field}__regex': '^' + re.escape(marker)}
+
+
+def email(marker, suffix):
+    return f'{marker}{suffix}@example.com'
+
+
+def foreign_rows():
+    """ Whether the database holds rows other than the ones of benchmark runs """
+
+    return (
+        CustomUser.objects.exclude(email__regex=RUN_PATTERN).exists()
+        or DummyCategory.objects.exclude(label__regex=RUN_PATTERN).exists()
+    )
+
+
+def seed(marker, users, categories, dummies):
+    """ Create the rows of a run, returns the users """
+
+    create_users(users, password=PASSWORD, email=email(marker, '{}'))
+    category_ids = [category.id for category in create_categories(categories, label=f'{marker} category {{}}')]
+    create_dummies(dummies, category_ids, label=f'{marker} dummy {{}}', description='Benchmark dummy')
+    return bench_users(marker)
+
+
+def bench_users(marker):
+    return list(CustomUser.objects.filter(**marked('email', marker), is_active=True).order_by('id'))
+
+
+def cleanup(marker):
+    """ Delete the rows of a run, the ones created by the scenarios included """
+
+    for category in DummyCategory.objects.filter(**marked('label', marker)):
+        delete_category(category)
+    CustomUser.objects.filter(**marked('email', marker)).delete()
+
+
+class Scenario:
+    """ Builds the successive requests of a scenario, `request(i)` returns (method, path, body, headers) """
+
+    def __init__(self, name, request):
+        self.name = name
+        self.request = request
+
+
+def build_scenarios(users, batch_size, marker):
+    categories = list(DummyCategory.objects.filter(**marked('label', marker)).values_list('id', flat=True))
+    tokens = [FastBlacklistRefreshToken.for_user(user) for user in users[:100]]
+    bearer = [{'Authorization': f'Bearer {token.access_token}'} for token in tokens]
+    # Deleted from the end so the protected list keeps reading the same first page
+    deletable = list(Dummy.objects.filter(category__in=categories).order_by('-id').values_list('id', flat=True))
+    batch = json.dumps([
+        {'label': f'{marker} posted {i}', 'description': 'Benchmark dummy', 'category': categories[0]}
+        for i in range(batch_size)
+    ]).encode()
+
+    def credentials(email):
+        return json.dumps({'email': email, 'password': PASSWORD}).encode()
+
+    return {
+        'signup': Scenario('signup', lambda i: (
+            'POST', '/auth/signup/', credentials(email(marker, f'signup-{i}')), None
+        )),
+        'login': Scenario('login', lambda i: (
+            'POST', '/auth/login/', credentials(users[i % len(users)].email), None
+        )),
+        'refresh': Scenario('refresh', lambda i: (
+            'POST', '/auth/token/refresh/', json.dumps({'refresh': str(tokens[i % len(tokens)])}).encode(), None
+        )),
+        'protected_list': Scenario('protected_list', lambda i: (
+            'GET', f'/dummy_app/dummy/protected/?page_size=50&_={i}', None, bearer[i % len(bearer)]
+        )),
+        'bulk_post': Scenario('bulk_post', lambda i: ('POST', '/dummy_app/dummy/', batch, None)),
+        'delete': Scenario('delete', lambda i: ('DELETE', f'/dummy_app/dummy/{deletable[i]}/', None, None)),
+    }
+
+
+async def drive(base_url, scenario, requests, concurrency):
+    latencies, statuses, errors, sequence = [], {}, 0, count()
+
+    async def worker():
+        nonlocal errors
+        connection = Connection(base_url)
+        while (i := next(sequence)) < requests:
+            method, path, body, headers = scenario.request(i)
+            start = time.perf_counter()
+            try:
+                status, _, _ = await connection.request(method, path, body, headers)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - start)
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    report = {
+        'requests': len(latencies),
+        'errors': errors + sum(count for status, count in statuses.items() if status >= 400),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput': round(len(latencies) / elapsed, 1) if elapsed else 0,
+    }
+    if len(latencies) >= 2:
+        percentiles = quantiles(latencies, n=100)
+        report.update({name: round(percentiles[index] * 1000, 2) for name, index in (('p50', 49), ('p95', 94), ('p99', 98))})
+    return report
+
+
+def compare(results, baseline, tolerance):
+    """ Scenarios whose p95 latency or throughput regressed by more than `tolerance` compared to `baseline` """
+
+    regressions = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or 'p95' not in result or 'p95' not in reference:
+            continue
+        problems = []
+        if result['p95'] > reference['p95'] * (1 + tolerance):
+            problems.append(f"p95 {reference['p95']} ms -> {result['p95']} ms")
+        if result['throughput'] < reference['throughput'] * (1 - tolerance):
+            problems.append(f"throughput {reference['throughput']} -> {result['throughput']} req/s")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the server')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--dummies', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=100, help='Dummies per bulk POST')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated subset of ' + ', '.join(SCENARIOS))
+    parser.add_argument('--run-id', help='Marker of the benchmark rows, random by default')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the benchmark rows of a previous --run-id')
+    parser.add_argument('--keep', action='store_true', help='Keep the benchmark rows at the end of the run')
+    parser.add_argument('--allow-existing-data', action='store_true',
+                        help='Run even though the database holds rows other than benchmark ones')
+    parser.add_argument('--output', help='Write the results to this file instead of the standard output')
+    parser.add_argument('--baseline', help='Results of a previous run to compare with')
+    parser.add_argument('--save-baseline', help='Also write the results to this file, as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Accepted regression, 0.2 for 20%%')
+    args = parser.parse_args()
+
+    names = [name for name in args.scenarios.split(',') if name]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    if 'delete' in names and args.requests > args.dummies:
+        parser.error('the delete scenario needs --dummies to be at least --requests')
+
+    if args.no_seed and not args.run_id:
+        parser.error('--no-seed needs the --run-id of the rows to reuse')
+    if args.run_id and not re.fullmatch('[0-9a-f]+', args.run_id):
+        parser.error('--run-id must be made of lowercase hexadecimal digits')
+    if foreign_rows() and not args.allow_existing_data:
+        parser.error('the database holds rows other than benchmark ones, pass --allow-existing-data to run anyway')
+
+    marker = MARKER.format(args.run_id or secrets.token_hex(4))
+    users = bench_users(marker) if args.no_seed else seed(marker, args.users, args.categories, args.dummies)
+    if not users:
+        parser.error(f'no benchmark rows marked {marker}')
+    print(f'Benchmark rows marked {marker}', file=sys.stderr)
+
+    results = {}
+    try:
+        scenarios = build_scenarios(users, args.batch_size, marker)
+        for name in names:
+            results[name] = asyncio.run(drive(args.url, scenarios[name], args.requests, args.concurrency))
+            print(f"{name}: {results[name]['throughput']} req/s, p95 {results[name].get('p95')} ms", file=sys.stderr)
+    finally:
+        if not args.keep:
+            cleanup(marker)
+
+    report = {
+        'settings': {key: getattr(args, key) for key in ('requests', 'concurrency', 'users', 'dummies', 'batch_size')},
+        'results': results,
+    }
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['regressions'] = compare(results, json.load(file)['results'], args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(output + '\n')
+
+    sys.exit(1 if report.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import profiling, routers
+
+
+class PrimaryPinningMiddleware:
+    """
+    Reads of a client that just wrote go to the primary database for `DATABASE_REPLICA_PIN_SECONDS`, so a POST
+    followed by a GET does not hit a replica that has not caught up yet.
+    """
+
+    cookie_name = 'primary_pin'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state, token = routers.begin_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # The request state is shared with the ORM threads, `sync_to_async` copies the context variables
+        state, token = routers.begin_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Records the queries, SQL time, duplicated queries, serialization time and response size of every request into
+    `config.profiling.metrics`, per resolved URL name. Enabled by `PROFILING_ENABLED`, exported at `/metrics/`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        connection_created.connect(profiling.install_query_recorder, dispatch_uid='config.install_query_recorder')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # Connections opened before the middleware was loaded did not go through `connection_created`
+        for connection in connections.all(initialized_only=True):
+            profiling.install_query_recorder(connection)
+
+        profile, token = profiling.start_profile()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop_profile(token)
+        return self.record(request, response, profile, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        profile, token = profiling.start_profile()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.stop_profile(token)
+        return self.record(request, response, profile, time.perf_counter() - start)
+
+    def record(self, request, response, profile, duration):
+        match = request.resolver_match
+        endpoint = (match.url_name or match.view_name) if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        profiling.metrics.record(endpoint, request.method, response.status_code, profile, duration, size)
+        return response
@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """ `JSONParser` parsing through orjson when it is installed, with the standard library as a fallback """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+        except (UnicodeDecodeError, LookupError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Let `json` have the final say, it accepts integers wider than 64 bits and words the error message
+            pass
+
+        try:
+            return json.loads(content)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
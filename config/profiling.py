@@ -0,0 +1,168 @@
+"""
+Per-request profiling: database queries, SQL time, duplicated queries, serialization time and response size,
+aggregated per resolved URL name and exported in the Prometheus text format.
+
+`config.middleware.ProfilingMiddleware` opens a `RequestProfile` for each request, the database execute wrapper and
+the `timed()` sections record into the profile of the current context (the context variable follows the requests
+into the `sync_to_async` threads).
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)
+        self._depth = Counter()
+
+    def add_query(self, sql, params, elapsed):
+        self.queries += 1
+        self.sql_time += elapsed
+        self.statements[(sql, str(params))] += 1
+
+    @property
+    def duplicate_queries(self):
+        """ Queries repeating an earlier one of the request with the same parameters """
+
+        return sum(count - 1 for count in self.statements.values())
+
+    @property
+    def repeated_statements(self):
+        """ SQL statements run more than once with different parameters, the N+1 pattern """
+
+        per_sql = Counter()
+        for (sql, _), count in self.statements.items():
+            per_sql[sql] += count
+        return {sql: count for sql, count in per_sql.items() if count > 1}
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current_profile.set(profile)
+
+
+def stop_profile(token):
+    _current_profile.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """ Database execute wrapper recording the queries into the current profile, if any """
+
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, params, time.perf_counter() - start)
+
+
+def install_query_recorder(connection, **kwargs):
+    """ Add `record_query()` to a connection, for the `connection_created` signal (each thread has its own) """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed(section):
+    """ Decorator adding the run time of a function to the `section` timing of the current profile """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+
+            # Only the outermost call counts, serializers nest
+            profile._depth[section] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile._depth[section] -= 1
+                if not profile._depth[section]:
+                    profile.timings[section] += time.perf_counter() - start
+
+        return wrapper
+
+    return decorator
+
+
+class EndpointMetrics:
+    """ Process-wide totals per endpoint, exported as Prometheus counters """
+
+    # Metric name, help and the total it exports
+    counters = (
+        ('requests', 'Requests served', lambda totals: totals['requests']),
+        ('request_seconds', 'Time spent serving the requests', lambda totals: totals['duration']),
+        ('db_queries', 'Database queries', lambda totals: totals['queries']),
+        ('db_query_seconds', 'Time spent in database queries', lambda totals: totals['sql_time']),
+        ('db_duplicate_queries', 'Queries repeating an earlier query of the same request', lambda totals: totals['duplicates']),
+        ('serialize_seconds', 'Time spent serializing and rendering', lambda totals: totals['serialize']),
+        ('response_bytes', 'Size of the response bodies, streamed bodies excluded', lambda totals: totals['bytes']),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(Counter)
+
+    def record(self, endpoint, method, status, profile, duration, size):
+        totals = {
+            'requests': 1,
+            'duration': duration,
+            'queries': profile.queries,
+            'sql_time': profile.sql_time,
+            'duplicates': profile.duplicate_queries,
+            'serialize': profile.timings['serialize'],
+            'bytes': size,
+        }
+        with self._lock:
+            self._totals[(endpoint, method, str(status))].update(totals)
+
+    def clear(self):
+        with self._lock:
+            self._totals.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: Counter(totals) for labels, totals in self._totals.items()}
+
+    def render(self, prefix='django_endpoint'):
+        """ Prometheus text exposition format """
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, help_text, value in self.counters:
+            lines.append(f'# HELP {prefix}_{name}_total {help_text}')
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for (endpoint, method, status), totals in sorted(snapshot.items()):
+                labels = f'endpoint="{escape_label(endpoint)}",method="{method}",status="{status}"'
+                lines.append(f'{prefix}_{name}_total{{{labels}}} {format_value(value(totals))}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = EndpointMetrics()
@@ -0,0 +1,112 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Per-request routing state, set up by `config.middleware.PrimaryPinningMiddleware`
+_request_state = ContextVar('request_state', default=None)
+
+# Routing state of the work done outside of a request, management commands mostly, for the whole process
+_process_state = None
+
+# Replica alias -> (healthy, checked at) cache, shared by the threads of the process
+_replica_health = {}
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin_request(pinned=False):
+    """ Start routing a new request, `pinned` sends all its reads to the primary """
+
+    state = RequestState(pinned)
+    return state, _request_state.set(state)
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+def process_state():
+    """ The routing state of the code running outside of a request, created on first use """
+
+    global _process_state
+    if _process_state is None:
+        _process_state = RequestState()
+    return _process_state
+
+
+def pin_to_primary():
+    """ Send the remaining reads of the current request to the primary """
+
+    state = _request_state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def check_replica(alias):
+    """ Whether a replica is reachable and, on PostgreSQL, not lagging behind the primary """
+
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+                )
+                lag = cursor.fetchone()[0]
+            return lag <= settings.DATABASE_REPLICA_MAX_LAG
+        return True
+    except DatabaseError:
+        return False
+
+
+def healthy_replicas():
+    """ Replica aliases currently fit for reads, each one is checked at most once per check interval """
+
+    now = time.monotonic()
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        healthy, checked_at = _replica_health.get(alias, (None, None))
+        if checked_at is None or now - checked_at > settings.DATABASE_REPLICA_CHECK_INTERVAL:
+            healthy = check_replica(alias)
+            _replica_health[alias] = (healthy, now)
+        if healthy:
+            replicas.append(alias)
+    return replicas
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random healthy replica and writes to the primary.
+
+    Once a request writes, its remaining reads go to the primary as well so it always reads its own writes, the
+    middleware then keeps the client on the primary for a few more seconds through a cookie. Outside of a request,
+    the process is pinned once it writes: a management command reads back the rows it just wrote.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get() or _process_state
+        if state is not None and state.pinned:
+            return 'default'
+
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get() or process_state()
+        state.pinned = state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -9,10 +9,12 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 '''
+from copy import deepcopy
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.ProfilingMiddleware',
+    'config.middleware.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,10 +81,67 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+DB_ENGINE = config('DB_ENGINE', default='django.db.backends.sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': DB_ENGINE,
+        'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        'USER': config('DB_USER', default=''),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default=''),
+        'PORT': config('DB_PORT', default=''),
+        # Keep connections open between requests, and check them before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
+    }
+}
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        # Wait for the write lock instead of failing right away with "database is locked"
+        'timeout': config('DB_SQLITE_BUSY_TIMEOUT', default=20, cast=int),
+        # Take the write lock when the transaction starts, so a reader never has to upgrade its lock mid-transaction
+        'transaction_mode': 'IMMEDIATE',
+        # WAL lets readers run alongside the writer, NORMAL sync is durable enough in WAL mode
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f"PRAGMA mmap_size={config('DB_SQLITE_MMAP_SIZE', default=268435456, cast=int)};"
+        ),
+    }
+elif config('DB_POOL', default=False, cast=bool):
+    # psycopg 3 connection pool, it replaces persistent connections
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# Read replicas, given as file names for SQLite and as host names otherwise
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = deepcopy(DATABASES['default'])
+    DATABASES[alias]['NAME' if DB_ENGINE == 'django.db.backends.sqlite3' else 'HOST'] = replica
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)  # Primary reads after a write
+DATABASE_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=float)  # Seconds before a replica is skipped
+DATABASE_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=10, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        # Use django.core.cache.backends.redis.RedisCache with a redis:// location to share the cache between workers
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
     }
 }
 
@@ -104,6 +165,34 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, the first hasher is used for new passwords and the others only verify the existing hashes, which
+# are upgraded on the next login. Argon2 is preferred when `argon2-cffi` is installed, and the cost parameters can be
+# tuned to the hardware with `python manage.py benchmark_hashers`
+
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2' if find_spec('argon2') else 'pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=870000, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+
+PASSWORD_HASHERS = [
+    'users.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'users.hashers.TunableArgon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+
+# Async authentication views (`users.async_views`), served in place of the DRF ones when enabled. They hash passwords
+# in a pool of PASSWORD_HASHING_WORKERS threads (0 for one per CPU) holding at most PASSWORD_HASHING_QUEUE_SIZE
+# waiting passwords, beyond that they answer 503 with a Retry-After of PASSWORD_HASHING_RETRY_AFTER seconds
+USERS_ASYNC_VIEWS = config('USERS_ASYNC_VIEWS', default=False, cast=bool)
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=0, cast=int)
+PASSWORD_HASHING_QUEUE_SIZE = config('PASSWORD_HASHING_QUEUE_SIZE', default=32, cast=int)
+PASSWORD_HASHING_RETRY_AFTER = config('PASSWORD_HASHING_RETRY_AFTER', default=1, cast=int)
+
 REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
@@ -111,8 +200,29 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Default size of keyset-paginated list responses, PAGE_SIZE needs a pagination class (DRF check W001)
+    'DEFAULT_PAGINATION_CLASS': 'dummy_app.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    # Sliding window rates of `users.throttling`, per client address (_ip) and per targeted email (_email)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+        'login_email': config('THROTTLE_LOGIN_EMAIL', default='10/min'),
+        'signup_ip': config('THROTTLE_SIGNUP_IP', default='20/hour'),
+        'password_reset_ip': config('THROTTLE_PASSWORD_RESET_IP', default='20/hour'),
+        'password_reset_email': config('THROTTLE_PASSWORD_RESET_EMAIL', default='5/hour'),
+        'password_reset_confirm_ip': config('THROTTLE_PASSWORD_RESET_CONFIRM_IP', default='20/hour'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -122,6 +232,35 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(days=30),
     'SLIDING_TOKEN_REFRESH_LIFETIME_LATE_USER': timedelta(days=1),
     'SLIDING_TOKEN_LIFETIME_LATE_USER': timedelta(days=30),
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.FastBlacklistTokenRefreshSerializer',
+}
+
+# In-process caches of `users.authentication.CachedJWTAuthentication`: maximum number of entries, and how long
+# (in seconds) another process may keep serving a user that was deactivated or changed password
+JWT_AUTH_CACHE_SIZE = config('JWT_AUTH_CACHE_SIZE', default=10000, cast=int)
+JWT_AUTH_CACHE_TTL = config('JWT_AUTH_CACHE_TTL', default=60, cast=int)
+
+# Refresh token blacklist checks through the in-process index of `users.blacklist`. The index is kept in sync through
+# the cache, so it is only enabled by default with a cache shared between the processes (not the local-memory one)
+JWT_BLACKLIST_CACHE_ALIAS = 'default'
+JWT_BLACKLIST_FAST_CHECK = config(
+    'JWT_BLACKLIST_FAST_CHECK', default=not CACHES['default']['BACKEND'].endswith('LocMemCache'), cast=bool
+)
+JWT_BLACKLIST_INDEX_CAPACITY = config('JWT_BLACKLIST_INDEX_CAPACITY', default=100000, cast=int)
+JWT_BLACKLIST_INDEX_MAX_AGE = config('JWT_BLACKLIST_INDEX_MAX_AGE', default=3600, cast=int)
+
+# Request profiling (`config.middleware.ProfilingMiddleware`), exported to the listed addresses at /metrics/
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_METRICS_IPS = config('PROFILING_METRICS_IPS', default='127.0.0.1', cast=Csv())
+
+# Maximum number of queries per request, by URL name, asserted by `config.testing.QueryBudgetMixin`
+ENDPOINT_QUERY_BUDGETS = {
+    'dummy-objects-view': 5,  # The list, or the categories, savepoint, INSERT, counters and release of a bulk create
+    'dummy-object-view': 3,  # The object, or the object, its deletion (and cascade) when deleting
+    'dummy-categories-view': 1,
+    'signup-view': 3,
+    'login-view': 2,
+    'password-reset-request-view': 2,
 }
 
 # Internationalization
@@ -161,3 +300,33 @@ if DEBUG:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Outbox delivered by `manage.py send_queued_mail`
+EMAIL_QUEUE_MAX_ATTEMPTS = config('EMAIL_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_QUEUE_RETRY_DELAY = config('EMAIL_QUEUE_RETRY_DELAY', default=30, cast=int)  # Seconds, doubled on each retry
+EMAIL_QUEUE_MAX_RETRY_DELAY = config('EMAIL_QUEUE_MAX_RETRY_DELAY', default=3600, cast=int)
+EMAIL_QUEUE_LEASE = config('EMAIL_QUEUE_LEASE', default=300, cast=int)  # Seconds a worker owns a claimed email
+
+# Bulk sending through `users.mail.send_bulk`
+EMAIL_POOL_SIZE = config('EMAIL_POOL_SIZE', default=4, cast=int)  # SMTP connections kept open
+EMAIL_BULK_BATCH_SIZE = config('EMAIL_BULK_BATCH_SIZE', default=100, cast=int)  # Messages per `send_messages` call
+
+
+# Dummy app configuration
+
+# Number of rows written per INSERT statement by the bulk ingestion paths
+DUMMY_BULK_BATCH_SIZE = config('DUMMY_BULK_BATCH_SIZE', default=1000, cast=int)
+
+# Collation of the Dummy labels: bytewise on every backend (SQLite compares bytewise already), so that a range on the
+# label is exactly a prefix match and the `label` filter of the list stays an index range on PostgreSQL too
+DUMMY_LABEL_COLLATION = 'C' if DB_ENGINE == 'django.db.backends.postgresql' else None
+
+# Most dummies a filtered DELETE request may remove, larger deletes are left to the `delete_dummies` command
+DUMMY_BULK_DELETE_MAX_ROWS = config('DUMMY_BULK_DELETE_MAX_ROWS', default=10000, cast=int)
+
+# Cache holding the GET responses of the Dummy endpoints, and how long they are kept (in seconds)
+DUMMY_CACHE_ALIAS = 'default'
+DUMMY_CACHE_TIMEOUT = config('DUMMY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Serve the async-native Dummy views (`dummy_app.async_views`) instead of the sync ones, for ASGI deployments
+DUMMY_ASYNC_VIEWS = config('DUMMY_ASYNC_VIEWS', default=False, cast=bool)
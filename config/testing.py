@@ -0,0 +1,56 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    `TestCase` mixin asserting an endpoint stays within the number of queries `ENDPOINT_QUERY_BUDGETS` allows for its
+    URL name, and does not run the same query twice, so that an N+1 regression fails the tests.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, url_name, budget=None, allow_duplicates=False):
+        if budget is None:
+            budget = settings.ENDPOINT_QUERY_BUDGETS[url_name]
+
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        queries = [query['sql'] for query in context.captured_queries]
+        listing = '\n'.join(f'{i}. {sql}' for i, sql in enumerate(queries, start=1))
+        if len(queries) > budget:
+            self.fail(f'{url_name} ran {len(queries)} queries, over its budget of {budget}:\n{listing}')
+
+        duplicates = {sql: count for sql, count in Counter(queries).items() if count > 1}
+        if duplicates and not allow_duplicates:
+            self.fail(f'{url_name} ran {sum(duplicates.values())} duplicated queries:\n{listing}')
+
+
+class QueryPlanMixin:
+    """
+    `TestCase` mixin reading the database's `EXPLAIN` output, to assert the hot queries are served by the index meant
+    for them instead of a full table scan.
+    """
+
+    def explain(self, query):
+        """ Plan of a queryset, or of a raw SQL statement such as one captured by `CaptureQueriesContext` """
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The test tables are tiny, a sequential scan would always win the planner's estimate
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            if not isinstance(query, str):
+                return query.explain()
+            prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+            cursor.execute(f'{prefix} {query}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, query, index):
+        plan = self.explain(query)
+        if index not in plan:
+            self.fail(f'The query does not use {index}:\n{getattr(query, "query", query)}\n{plan}')
+        return plan
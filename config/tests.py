@@ -0,0 +1,317 @@
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from benchmarks.run import compare, summarize
+from dummy_app import cache as dummy_cache
+from dummy_app.bulk import delete_dummies
+from dummy_app.models import Dummy, DummyCategory
+from . import profiling, routers
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .testing import QueryBudgetMixin
+
+REPLICA = 'replica_test'
+
+
+class ReplicaRouterTests(TestCase):
+    """ Routing tests using a second SQLite file as the replica of the (in-memory) test database """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        routers._replica_health.clear()
+        routers._process_state = None
+        self.addCleanup(setattr, routers, '_process_state', None)
+
+        self.add_replica(REPLICA, os.path.join(self.tmp_dir.name, 'replica.sqlite3'))
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(DummyCategory)
+            editor.create_model(Dummy)
+        DummyCategory.objects.using(REPLICA).create(label="Replica category")
+
+    def add_replica(self, alias, name):
+        settings_dict = deepcopy(connections['default'].settings_dict)
+        settings_dict['NAME'] = name
+        connections[alias] = connections['default'].__class__(settings_dict, alias)
+
+        def remove():
+            connections[alias].close()
+            del connections[alias]
+        self.addCleanup(remove)
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_reads_go_to_replica(self):
+        """ Test reads outside of a request are served by the replica """
+
+        self.assertEqual(list(DummyCategory.objects.values_list('label', flat=True)), ["Replica category"])
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_reads_after_write_are_pinned_to_primary(self):
+        """ Test a request reads its own writes once it wrote """
+
+        state, token = routers.begin_request()
+        try:
+            self.assertEqual(DummyCategory.objects.count(), 1)  # Replica
+            DummyCategory.objects.create(label="Primary category")
+            self.assertTrue(state.wrote)
+            self.assertEqual(list(DummyCategory.objects.values_list('label', flat=True)), ["Primary category"])
+        finally:
+            routers.end_request(token)
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_reads_after_write_outside_of_request_are_pinned_to_primary(self):
+        """ Test code running outside of a request, a management command, reads its own writes """
+
+        self.assertEqual(DummyCategory.objects.count(), 1)  # Replica
+        DummyCategory.objects.create(label="Primary category")
+        self.assertTrue(routers.process_state().wrote)
+        self.assertEqual(list(DummyCategory.objects.values_list('label', flat=True)), ["Primary category"])
+
+        # Requests keep their own state
+        state, token = routers.begin_request()
+        try:
+            self.assertEqual(list(DummyCategory.objects.values_list('label', flat=True)), ["Replica category"])
+        finally:
+            routers.end_request(token)
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_bulk_delete_runs_on_primary(self):
+        """ Test the batched deletes read and delete the rows of the primary, never those of a replica """
+
+        for alias in ('default', REPLICA):
+            category = DummyCategory.objects.using(alias).get_or_create(label="Replica category")[0]
+            Dummy.objects.using(alias).bulk_create(
+                Dummy(label=f"Doomed {i}", description="", category_id=category.id) for i in range(3)
+            )
+        routers._process_state = None
+
+        self.assertEqual(delete_dummies({'label__startswith': "Doomed"}, batch_size=2), 3)
+        self.assertEqual(Dummy.objects.using('default').count(), 0)
+        self.assertEqual(Dummy.objects.using(REPLICA).count(), 3)
+
+        # Same for the raw deletes of `seed --clear`
+        routers._process_state = None
+        call_command('seed', clear=True, categories=0, stdout=StringIO())
+        self.assertEqual(DummyCategory.objects.using('default').count(), 0)
+        self.assertEqual(DummyCategory.objects.using(REPLICA).count(), 1)
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA, 'replica_down'])
+    def test_unreachable_replica_is_skipped(self):
+        """ Test a replica that cannot be connected to is left out of the rotation """
+
+        self.add_replica('replica_down', os.path.join(self.tmp_dir.name, 'missing', 'replica.sqlite3'))
+        self.assertEqual(routers.healthy_replicas(), [REPLICA])
+
+        routers._replica_health.clear()
+        routers._process_state = None
+        self.addCleanup(setattr, routers, '_process_state', None)
+        with override_settings(DATABASE_REPLICAS=['replica_down']):
+            self.assertEqual(routers.ReplicaRouter().db_for_read(DummyCategory), 'default')
+
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_client_is_pinned_to_primary_after_write(self):
+        """ Test a POST followed by a GET reads the freshly created object from the primary """
+
+        category = DummyCategory.objects.create(label="Primary category")
+        data = {'label': 'Dummy Label', 'description': 'Some text', 'category': category.id}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('dummy-objects-view'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('primary_pin', response.cookies)
+
+        response = self.client.get(reverse('dummy-object-view', args=(response.data['id'],)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Without the cookie reads are served by the replica, which never saw the write. The cached Dummy responses
+        # are built from the primary for a while after a write, the categories are not cached.
+        self.client.cookies.clear()
+        response = self.client.get(reverse('dummy-categories-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([obj['label'] for obj in response.data], ["Replica category"])
+        response = self.client.get(reverse('dummy-objects-view'))
+        self.assertEqual(len(response.data), 1)
+
+        # Once the replicas are deemed caught up, cache misses are read from them again
+        cache.delete(dummy_cache.RECENT_WRITE_KEY)
+        self.assertEqual(self.client.get(reverse('dummy-objects-view'), {'page_size': 10}).data, [])
+
+
+class JSONRenderingTests(TestCase):
+    payload = [
+        OrderedDict(id=1, label="Dummy 1", description="Plain text", category=1),
+        {
+            'unicode': "Ünïcödé \u4e2d\u6587 \U0001f600",
+            'escapes': "quote \" backslash \\ newline \n tab \t control \x01 \x1f del \x7f",
+            'separators': "line \u2028 paragraph \u2029",
+            'datetime': datetime(2024, 5, 17, 10, 30, 15, 123456, tzinfo=timezone.utc),
+            'decimal': Decimal('12.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy("This field is required."),
+            'error': ErrorDetail("Invalid value.", code='invalid'),
+            'nested': [None, True, False, 0, -1, [], {}],
+            1: "non string key",
+        },
+    ]
+
+    def test_renderer_output_is_identical(self):
+        """ Test the fast renderer outputs the same bytes as DRF's renderer """
+
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+        # Falls back to `json` for what orjson cannot encode
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), b'{"big":1180591620717411303424}')
+
+        indented = FastJSONRenderer().render(self.payload, 'application/json; indent=4')
+        self.assertEqual(indented, JSONRenderer().render(self.payload, 'application/json; indent=4'))
+
+    def test_parser_output_is_identical(self):
+        """ Test the fast parser reads back the same data as DRF's parser """
+
+        content = JSONRenderer().render(self.payload) + b' '
+        self.assertEqual(FastJSONParser().parse(BytesIO(content)), JSONParser().parse(BytesIO(content)))
+
+        for invalid in (b'{"a": 1', b'[NaN]', b''):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(invalid))
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        profiling.metrics.clear()
+        self.client = APIClient()
+
+        self.category = DummyCategory.objects.create(label="Category 1")
+        Dummy.objects.bulk_create([
+            Dummy(label=f"Dummy {i}", description="Description", category=self.category) for i in range(20)
+        ])
+
+
+    def test_requests_are_profiled_per_endpoint(self):
+        """ Test the queries, serialization time and response size are recorded per URL name """
+
+        response = self.client.get(reverse('dummy-objects-view'), {'expand': 'category'})
+        self.client.get(reverse('dummy-object-view', args=(1000000,)))
+
+        totals = profiling.metrics.snapshot()
+        listing = totals[('dummy-objects-view', 'GET', '200')]
+        self.assertEqual((listing['requests'], listing['queries'], listing['duplicates']), (1, 1, 0))
+        self.assertEqual(listing['bytes'], len(response.content))
+        self.assertGreater(listing['serialize'], 0)
+        self.assertEqual(totals[('dummy-object-view', 'GET', '404')]['queries'], 1)
+
+
+    def test_duplicate_queries(self):
+        """ Test a query repeated with the same parameters counts as a duplicate """
+
+        profile, token = profiling.start_profile()
+        try:
+            profiling.install_query_recorder(connection)
+            for _ in range(3):
+                list(Dummy.objects.filter(id=1))
+            list(Dummy.objects.filter(id=2))
+        finally:
+            profiling.stop_profile(token)
+
+        self.assertEqual((profile.queries, profile.duplicate_queries), (4, 2))
+        self.assertEqual(list(profile.repeated_statements.values()), [4])
+
+
+    def test_metrics_endpoint(self):
+        """ Test the metrics are exported in the Prometheus text format to the allowed addresses only """
+
+        self.client.get(reverse('dummy-objects-view'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            'django_endpoint_db_queries_total{endpoint="dummy-objects-view",method="GET",status="200"} 1',
+            response.content.decode().splitlines(),
+        )
+
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_query_budgets(self):
+        """ Test the Dummy endpoints stay within their query budget, and that going over it fails """
+
+        with self.assertQueryBudget('dummy-objects-view'):
+            self.client.get(reverse('dummy-objects-view'), {'expand': 'category'})
+
+        data = [{'label': f"New {i}", 'description': "Description", 'category': self.category.id} for i in range(50)]
+        with self.assertQueryBudget('dummy-objects-view'):
+            self.client.post(reverse('dummy-objects-view'), data, format='json')
+
+        with self.assertQueryBudget('dummy-object-view'):
+            self.client.delete(reverse('dummy-object-view', args=(1,)))
+
+        # One query per category, the N+1 pattern
+        with self.assertRaisesMessage(AssertionError, 'over its budget of 5'):
+            with self.assertQueryBudget('dummy-objects-view'):
+                [dummy.category.label for dummy in Dummy.objects.all()[:10]]
+
+
+class BenchmarkTests(TestCase):
+
+    def test_summarize(self):
+        """ Test the latency percentiles, throughput and error count of a scenario run """
+
+        report = summarize([i / 1000 for i in range(1, 101)], {200: 98, 429: 2}, 1, 2.0)
+        self.assertEqual(report['requests'], 100)
+        self.assertEqual(report['errors'], 3)
+        self.assertEqual(report['statuses'], {'200': 98, '429': 2})
+        self.assertEqual(report['throughput'], 50.0)
+        self.assertEqual((report['p50'], report['p95'], report['p99']), (50.5, 95.95, 99.99))
+
+        self.assertNotIn('p95', summarize([0.1], {200: 1}, 0, 0))
+
+
+    def test_compare_flags_regressions(self):
+        """ Test only the scenarios whose p95 or throughput worsened beyond the tolerance are flagged """
+
+        baseline = {
+            'login': {'p95': 100.0, 'throughput': 50.0},
+            'refresh': {'p95': 10.0, 'throughput': 500.0},
+            'delete': {'p95': 20.0, 'throughput': 200.0},
+        }
+        results = {
+            'login': {'p95': 119.0, 'throughput': 41.0},  # Within 20%
+            'refresh': {'p95': 13.0, 'throughput': 500.0},
+            'delete': {'p95': 20.0, 'throughput': 150.0},
+            'signup': {'p95': 500.0, 'throughput': 1.0},  # Not in the baseline
+        }
+
+        self.assertEqual(compare(results, baseline, 0.2), {
+            'refresh': ['p95 10.0 ms -> 13.0 ms'],
+            'delete': ['throughput 200.0 -> 150.0 req/s'],
+        })
+        self.assertEqual(compare(results, baseline, 0.5), {})
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .profiling import metrics as endpoint_metrics
+
+
+def metrics(request):
+    """ Endpoint metrics of this process in the Prometheus text format, for the `PROFILING_METRICS_IPS` only """
+
+    if request.META.get('REMOTE_ADDR') not in settings.PROFILING_METRICS_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(endpoint_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
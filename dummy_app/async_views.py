@@ -0,0 +1,153 @@
+"""
+Async-native Dummy endpoints, served on the routes of `dummy_app.views` when `DUMMY_ASYNC_VIEWS` is enabled.
+
+Under ASGI, Django runs the sync views in a thread, one `sync_to_async` hop per request. These views run on the
+event loop instead and only leave it for the database, through the async ORM (which still runs the queries in a
+thread, the database drivers being sync), and for the token authentication which may load the user. Whether that
+serves more requests depends on the deployment, compare both with `benchmarks/loadgen.py` before switching: on a
+single shared CPU with SQLite, the sync views under gunicorn served more requests than these under uvicorn.
+"""
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.response import SimpleTemplateResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .bulk import abulk_create_dummies
+from .cache import cache_response
+from .models import Dummy, DummyCategory
+from .pagination import keyset_after
+from .serializers import DummySerializer, DummyValuesSerializer, referenced_categories
+from .streaming import astream_json_array
+from .views import DummyView
+
+
+class AsyncDummyView(DummyView):
+    """ `DummyView` with async handlers, same parameters, responses and cache """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Same as `APIView.dispatch()`, awaiting the handlers
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            if request.META.get('HTTP_AUTHORIZATION'):
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+            else:
+                # Anonymous requests are authenticated, checked and throttled without any query
+                self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # OPTIONS is handled by the sync `APIView.options()`
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render(self.response)
+
+    @staticmethod
+    def render(response):
+        """ Render DRF responses right away, Django would otherwise render them in a thread """
+
+        if not isinstance(response, SimpleTemplateResponse):
+            return response
+
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code, headers=dict(response.items()))
+        rendered.cookies = response.cookies
+        return rendered
+
+    @cache_response
+    async def get(self, request, pk=None):
+        serializer_kwargs, error = self.get_serializer_kwargs(request)
+        if error:
+            return error
+        objects = self.get_queryset(**serializer_kwargs)
+
+        if pk:
+            try:
+                instance = await objects.aget(id=pk)
+            except Dummy.DoesNotExist:
+                return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(DummySerializer(instance, **serializer_kwargs).data)
+
+        filters, ordering, error = self.get_filters(request)
+        if error:
+            return error
+        serializer = DummyValuesSerializer(**serializer_kwargs, ordering=ordering)
+        rows = serializer.get_queryset(objects.filter(**filters).order_by(*ordering))
+
+        paginator = self.get_paginator(request, serializer)
+        if request.query_params.get('stream') in ('1', 'true'):
+            if isinstance(paginator, self.search_pagination_class):
+                return Response({"error": "Search results can not be streamed"}, status=status.HTTP_400_BAD_REQUEST)
+            return self.stream(rows, serializer)
+
+        page = await paginator.apaginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response(serializer.to_representation(page))
+
+    def stream(self, rows, serializer):
+        chunks = self.chunks(rows, serializer, self.stream_chunk_size)
+        chunks = (serializer.to_representation(chunk) async for chunk in chunks)
+        return StreamingHttpResponse(astream_json_array(chunks), content_type='application/json')
+
+    @staticmethod
+    async def chunks(rows, serializer, size):
+        """
+        Rows of a `values_list()` queryset, a keyset query per chunk. `aiterator()` can not be used, it runs the
+        first query of `values_list()` querysets in the event loop.
+        """
+
+        after = None
+        while True:
+            page = rows if after is None else rows.filter(keyset_after(serializer.ordering, after))
+            chunk = [row async for row in page[:size]]
+            if chunk:
+                yield chunk
+            if len(chunk) < size:
+                return
+            after = serializer.ordering_key(chunk[-1])
+
+    async def post(self, request):
+        many = isinstance(request.data, list)
+
+        # Resolve the categories beforehand, the validation then runs without any query
+        categories = await DummyCategory.objects.ain_bulk(referenced_categories(request.data if many else [request.data]))
+        serializer = DummySerializer(data=request.data, many=many, context={'categories': categories})
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if many:
+            serializer.instance = await abulk_create_dummies([Dummy(**attrs) for attrs in serializer.validated_data])
+        else:
+            serializer.instance = await Dummy.objects.acreate(**serializer.validated_data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    async def delete(self, request, pk=None):
+        if pk:
+            try:
+                obj = await Dummy.objects.aget(id=pk)
+                await obj.adelete()
+            except Dummy.DoesNotExist:
+                return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        else:
+            return await sync_to_async(self.bulk_delete)(request)
+
+
+class AsyncDummyViewProtected(AsyncDummyView):
+    permission_classes = (IsAuthenticated,)
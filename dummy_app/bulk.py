@@ -0,0 +1,162 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, pre_delete
+
+from . import signals
+from .cache import invalidate_dummies, invalidate_dummy_list
+from .counters import add_dummy_counts
+from .models import Dummy, DummyCategory
+from .pagination import keyset_after
+from .search import deferred_search_index
+from .streaming import chunked
+
+# Columns of the rows taken by `insert_dummy_rows()`
+ROW_FIELDS = ('label', 'description', 'category')
+CATEGORY_COLUMN = ROW_FIELDS.index('category')
+
+
+def bulk_create_dummies(objs, batch_size=None):
+    """ Insert unsaved Dummy instances with multi-row INSERTs inside a single transaction """
+
+    batch_size = batch_size or settings.DUMMY_BULK_BATCH_SIZE
+    with transaction.atomic():
+        objs = Dummy.objects.bulk_create(objs, batch_size=batch_size)
+        add_dummy_counts(Counter(obj.category_id for obj in objs))
+
+    # `bulk_create` does not send `post_save`
+    invalidate_dummy_list()
+    return objs
+
+
+def insert_dummy_rows(rows, batch_size=None):
+    """
+    Insert `(label, description, category_id)` tuples with `executemany()`, inside a single transaction.
+
+    Meant for the ingestion paths (seeding, imports) where building model instances and compiling the INSERT
+    costs ten times more than running it. The values are not validated nor converted, returns the number of rows.
+    """
+
+    batch_size = batch_size or settings.DUMMY_BULK_BATCH_SIZE
+    using = router.db_for_write(Dummy)
+    connection = connections[using]
+    columns = ', '.join(connection.ops.quote_name(Dummy._meta.get_field(name).column) for name in ROW_FIELDS)
+    sql = (
+        f'INSERT INTO {connection.ops.quote_name(Dummy._meta.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(ROW_FIELDS))})'
+    )
+
+    inserted, counts = 0, Counter()
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            for batch in chunked(rows, batch_size):
+                cursor.executemany(sql, batch)
+                counts.update(row[CATEGORY_COLUMN] for row in batch)
+                inserted += len(batch)
+        add_dummy_counts(counts)
+
+    invalidate_dummy_list()
+    return inserted
+
+
+def existing_indexes(connection):
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, Dummy._meta.db_table))
+
+
+@contextmanager
+def deferred_indexes(using=None):
+    """
+    Drop the secondary indexes of the Dummy table, the full-text one included, for the duration of a bulk load and
+    build them again at the end. Building an index in one pass costs a fraction of keeping it current row by row,
+    but the queries that need these indexes scan the table in the meantime. Both steps skip the indexes already
+    dropped or built, so a load killed midway can be run again.
+    """
+
+    connection = connections[using or router.db_for_write(Dummy)]
+    with deferred_search_index(using):
+        existing = existing_indexes(connection)
+        with connection.schema_editor() as editor:
+            for index in Dummy._meta.indexes:
+                if index.name in existing:
+                    editor.remove_index(Dummy, index)
+        try:
+            yield
+        finally:
+            existing = existing_indexes(connection)
+            with connection.schema_editor() as editor:
+                for index in Dummy._meta.indexes:
+                    if index.name not in existing:
+                        editor.add_index(Dummy, index)
+
+
+def raw_delete_allowed():
+    """
+    Whether dummies can be deleted without the collector: nothing references Dummy so there is nothing to cascade to,
+    the only question is whether a delete receiver other than the ones `delete_dummies()` stands in for is connected
+    """
+
+    handled = {signals.invalidate_dummy_cache, signals.count_deleted_dummy}
+    for signal in (pre_delete, post_delete):
+        sync_receivers, async_receivers = signal._live_receivers(Dummy)
+        if (set(sync_receivers) | set(async_receivers)) - handled:
+            return False
+    return True
+
+
+def delete_dummies(filters, ordering=('id',), batch_size=None):
+    """
+    Delete the dummies matching the `filter()` keyword arguments `filters` a batch at a time, walking them in
+    `ordering`, the order an index serves the filters in. Each batch is deleted in its own transaction so locks are
+    held briefly and memory stays bounded, with a raw DELETE when `raw_delete_allowed()`, through the collector
+    otherwise. Returns the number of dummies deleted.
+    """
+
+    batch_size = batch_size or settings.DUMMY_BULK_BATCH_SIZE
+    # Everything runs on the primary, a queryset's own alias is the one it reads from: possibly a replica
+    using = router.db_for_write(Dummy)
+    fields = [name.lstrip('-') for name in ordering]
+    matching = (
+        Dummy.objects.using(using).filter(**filters).order_by(*ordering).values_list('id', 'category_id', *fields)
+    )
+    raw = raw_delete_allowed()
+
+    deleted, after = 0, None
+    while True:
+        rows = list((matching if after is None else matching.filter(keyset_after(ordering, after)))[:batch_size])
+        if not rows:
+            break
+
+        ids = [row[0] for row in rows]
+        with transaction.atomic(using=using):
+            batch = Dummy.objects.using(using).filter(id__in=ids)
+            if raw:
+                deleted += batch._raw_delete(using)
+                add_dummy_counts({pk: -count for pk, count in Counter(row[1] for row in rows).items()})
+            else:
+                deleted += batch.delete()[0]
+        if raw:
+            invalidate_dummies(ids)
+        after = rows[-1][2:]
+
+    return deleted
+
+
+def delete_category(category, batch_size=None):
+    """
+    Delete a category and its dummies without letting the `CASCADE` collector load them all at once: the dummies
+    go first with `delete_dummies()`, the collector then has nothing left to cascade to
+    """
+
+    deleted = delete_dummies({'category_id': category.pk}, batch_size=batch_size)
+    category.delete()
+    return deleted
+
+
+async def abulk_create_dummies(objs, batch_size=None):
+    """ `bulk_create_dummies()` for async callers, Django has no async transactions so it runs in a thread """
+
+    return await sync_to_async(bulk_create_dummies)(objs, batch_size)
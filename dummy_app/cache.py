@@ -0,0 +1,167 @@
+import hashlib
+import time
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from config import routers
+
+LIST_VERSION_KEY = 'dummy:version:list'
+CATEGORY_VERSION_KEY = 'dummy:version:category'
+DETAIL_VERSION_KEY = 'dummy:version:detail:{pk}'
+# Set for `DATABASE_REPLICA_PIN_SECONDS` by every invalidation, while the replicas may not have caught up yet
+RECENT_WRITE_KEY = 'dummy:recent-write'
+
+
+def get_cache():
+    return caches[settings.DUMMY_CACHE_ALIAS]
+
+
+def _versions(keys):
+    """
+    Current value of the version counters, missing counters are seeded with the current time so that counters
+    lost to an eviction or a cache flush never come back with a value that was already handed out.
+    """
+
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(*keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    cache.set(RECENT_WRITE_KEY, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def after_commit(func, *args):
+    """
+    Run an invalidation once the current transaction commits, right away outside of one. Run before, a concurrent
+    GET could still read the rows as they were and cache them under the new versions.
+    """
+
+    transaction.on_commit(partial(func, *args))
+
+
+def invalidate_dummy(pk):
+    """ Drop the cached responses a change to the Dummy `pk` makes stale """
+
+    after_commit(_bump, DETAIL_VERSION_KEY.format(pk=pk), LIST_VERSION_KEY)
+
+
+def _drop_dummies(pks):
+    get_cache().delete_many([DETAIL_VERSION_KEY.format(pk=pk) for pk in pks])
+    _bump(LIST_VERSION_KEY)
+
+
+def invalidate_dummies(pks):
+    """
+    Drop the cached responses of many dummies at once, for the bulk deletes. Their version counters are deleted rather
+    than bumped one by one, they come back seeded with the current time.
+    """
+
+    after_commit(_drop_dummies, list(pks))
+
+
+def invalidate_dummy_list():
+    """ Drop the cached list responses, for writes that do not go through the model signals (bulk paths) """
+
+    after_commit(_bump, LIST_VERSION_KEY)
+
+
+def invalidate_categories():
+    after_commit(_bump, CATEGORY_VERSION_KEY)
+
+
+def response_cache_key(request, pk=None):
+    """
+    Cache key and ETag of a GET response.
+
+    The key is made of the object (or the list), the query parameters, the authentication scope and the version
+    counters of everything the response depends on. Writes bump those counters instead of deleting keys, so the
+    ETag of a response is known without building it. The scheme and the host are part of it as well, the `Link`
+    header of the list pages is an absolute URL.
+    """
+
+    scope = 'user' if request.user and request.user.is_authenticated else 'anon'
+    query = '&'.join(sorted(f'{key}={value}' for key, values in request.query_params.lists() for value in values))
+    origin = f'{request.scheme}://{request.get_host()}'
+    target = DETAIL_VERSION_KEY.format(pk=pk) if pk else LIST_VERSION_KEY
+    versions = _versions([target, CATEGORY_VERSION_KEY])
+
+    key = f'{target}|{origin}|{scope}|{query}|{versions}'
+    digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+    return f'dummy:response:{digest}', quote_etag(digest)
+
+
+def cached_response(request, pk=None):
+    """ Cache key, ETag and response of a GET, the response is None when it has to be built """
+
+    key, etag = response_cache_key(request, pk)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return key, etag, Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    cached = get_cache().get(key)
+    if cached is not None:
+        data, headers = cached
+        return key, etag, Response(data, headers={**headers, 'ETag': etag})
+    return key, etag, None
+
+
+def build_from_primary():
+    """
+    Responses about to be cached are built from the primary for a few seconds after a write, a lagging replica would
+    get them cached stale under the new versions. Past `DATABASE_REPLICA_PIN_SECONDS` the replicas are trusted to
+    have caught up, as they are by `PrimaryPinningMiddleware`, and cache misses are read from them again.
+    """
+
+    if get_cache().get(RECENT_WRITE_KEY):
+        routers.pin_to_primary()
+
+
+def store_response(response, key, etag):
+    if response.status_code == status.HTTP_200_OK and not response.streaming:
+        headers = {name: response[name] for name in ('Link',) if response.has_header(name)}
+        get_cache().set(key, (response.data, headers), settings.DUMMY_CACHE_TIMEOUT)
+        response['ETag'] = etag
+    return response
+
+
+def cache_response(view_method):
+    """ Serve GETs from the cache, or with a 304 when the client already holds the current version """
+
+    if iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, pk=None):
+            # The cache backend calls block, they run in a thread
+            key, etag, response = await sync_to_async(cached_response)(request, pk)
+            if response is None:
+                await sync_to_async(build_from_primary)()
+                response = await sync_to_async(store_response)(await view_method(self, request, pk), key, etag)
+            return response
+
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, pk=None):
+        key, etag, response = cached_response(request, pk)
+        if response is None:
+            build_from_primary()
+            response = store_response(view_method(self, request, pk), key, etag)
+        return response
+
+    return wrapper
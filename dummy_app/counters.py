@@ -0,0 +1,32 @@
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Dummy, DummyCategory
+from .streaming import chunked
+
+# Categories updated per UPDATE statement, each one adds three parameters to the query
+UPDATE_BATCH_SIZE = 300
+
+
+def add_dummy_counts(deltas):
+    """
+    Add the `{category_id: delta}` changes to the `dummy_count` of the categories, as atomic `F()` increments with
+    a single UPDATE whatever the number of categories involved (up to `UPDATE_BATCH_SIZE`)
+    """
+
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    for batch in chunked(deltas.items(), UPDATE_BATCH_SIZE):
+        change = Case(*(When(id=pk, then=Value(delta)) for pk, delta in batch), output_field=IntegerField())
+        DummyCategory.objects.filter(id__in=[pk for pk, _ in batch]).update(dummy_count=F('dummy_count') + change)
+
+
+def recount(category_ids):
+    """ Set the `dummy_count` of the categories to their actual number of dummies, returns how many were off """
+
+    actual = Coalesce(
+        Subquery(
+            Dummy.objects.filter(category=OuterRef('pk')).order_by().values('category').annotate(n=Count('id')).values('n')
+        ),
+        0,
+    )
+    return DummyCategory.objects.filter(id__in=category_ids).exclude(dummy_count=actual).update(dummy_count=actual)
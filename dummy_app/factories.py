@@ -0,0 +1,40 @@
+from itertools import islice
+
+from .bulk import insert_dummy_rows
+from .models import Dummy, DummyCategory
+
+
+def create_categories(count, label='Category {}', start=0):
+    """ Insert `count` categories with a single query per batch, returns them (with their ids) """
+
+    return DummyCategory.objects.bulk_create(
+        [DummyCategory(label=label.format(i)) for i in range(start, start + count)], batch_size=1000
+    )
+
+
+def build_dummies(count, category_ids, label='Dummy {}', description='Description of dummy {}', start=0):
+    """ Lazily build `count` unsaved dummies, spread over the categories in turn """
+
+    for label, description, category_id in build_dummy_rows(count, category_ids, label, description, start):
+        yield Dummy(label=label, description=description, category_id=category_id)
+
+
+def build_dummy_rows(count, category_ids, label='Dummy {}', description='Description of dummy {}', start=0):
+    """ Lazily build the `(label, description, category_id)` rows of `count` dummies """
+
+    category_ids = list(category_ids)
+    for i in range(start, start + count):
+        yield label.format(i), description.format(i), category_ids[i % len(category_ids)]
+
+
+def create_dummies(count, category_ids, chunk_size=50000, **kwargs):
+    """
+    Insert `count` dummies a chunk at a time, so memory use does not depend on `count`: each chunk is built,
+    inserted in its own transaction, then dropped. Returns the number of rows inserted.
+    """
+
+    rows = build_dummy_rows(count, category_ids, **kwargs)
+    created = 0
+    while chunk := list(islice(rows, chunk_size)):
+        created += insert_dummy_rows(chunk)
+    return created
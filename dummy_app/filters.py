@@ -0,0 +1,91 @@
+ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'label': ('label', 'id'),
+    '-label': ('-label', '-id'),
+}
+
+# The filters and orderings an index serves, each maps to a range of the primary key, of `(category, id)` or of
+# `(label, id)`. Any other combination would sort or scan every matching row, so it is rejected.
+INDEXED = {
+    frozenset(): {'id', 'label'},
+    frozenset({'category'}): {'id'},
+    frozenset({'label'}): {'label'},
+}
+
+FILTER_PARAMS = ('category', 'label', 'id__in', 'ordering')
+MAX_IDS = 1000
+# Range of the 64-bit integer columns, larger values would fail in the database instead of matching nothing
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_int(value):
+    value = int(value)
+    if not MIN_INT <= value <= MAX_INT:
+        raise ValueError(value)
+    return value
+
+
+def prefix_range(prefix):
+    """
+    `label__startswith` as a range, `LIKE` can only use an index under some collations (case sensitive `LIKE` on
+    SQLite, `text_pattern_ops` on PostgreSQL) while a range always can. The range only equals the prefix match under
+    a bytewise collation, which the labels have on every backend (`DUMMY_LABEL_COLLATION`).
+    """
+
+    bounds = {'label__gte': prefix}
+    if ord(prefix[-1]) < 0x10FFFF:
+        bounds['label__lt'] = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return bounds
+
+
+def parse_filters(params):
+    """
+    Filters and ordering of the Dummy list out of its query parameters:
+
+    - `category=<id>`, the dummies of a category
+    - `label=<prefix>`, the dummies whose label starts with the prefix (case sensitive)
+    - `id__in=<id>,<id>,...`, at most `MAX_IDS` dummies by id
+    - `ordering=id|-id|label|-label`, by default id, or label when filtering on a label prefix
+
+    Returns the keyword arguments of `filter()` and the ordering, raises `FilterError` for invalid values and for
+    combinations no index serves. Looking dummies up by id bounds the result, so it combines with anything.
+    """
+
+    filters, names = {}, set()
+
+    if category := params.get('category'):
+        try:
+            filters['category_id'] = parse_int(category)
+        except ValueError:
+            raise FilterError('category must be an integer')
+        names.add('category')
+
+    if label := params.get('label'):
+        filters.update(prefix_range(label))
+        names.add('label')
+
+    ids = None
+    if (id_list := params.get('id__in')) is not None:
+        try:
+            ids = sorted({parse_int(pk) for pk in id_list.split(',') if pk})
+        except ValueError:
+            raise FilterError('id__in must be a comma separated list of integers')
+        if len(ids) > MAX_IDS:
+            raise FilterError(f'id__in accepts at most {MAX_IDS} ids')
+        filters['id__in'] = ids
+
+    indexed = INDEXED.get(frozenset(names), set())
+    ordering = params.get('ordering') or ('id' if ids is not None or 'id' in indexed else min(indexed, default='id'))
+    if ordering not in ORDERINGS:
+        raise FilterError(f"Unknown ordering: {ordering}, expected one of {', '.join(ORDERINGS)}")
+
+    if ids is None and ordering.lstrip('-') not in indexed:
+        raise FilterError(f"Unindexed filter and ordering combination: {', '.join(sorted(names)) or 'no filter'} "
+                          f"ordered by {ordering}")
+
+    return filters, ORDERINGS[ordering]
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dummy_app.bulk import delete_category, delete_dummies
+from dummy_app.filters import FilterError, parse_filters
+from dummy_app.models import DummyCategory
+
+
+class Command(BaseCommand):
+    help = ('Delete the dummies matching the filters, or a whole category, a batch of rows per transaction so locks '
+            'stay short and memory bounded whatever the number of rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help='Delete the dummies of this category')
+        parser.add_argument('--label', help='Delete the dummies whose label starts with this prefix')
+        parser.add_argument('--ids', help='Delete the dummies with these comma separated ids')
+        parser.add_argument('--with-category', action='store_true', help='Delete the --category itself as well')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of dummies deleted per transaction')
+
+    def handle(self, *args, **options):
+        if options['with_category']:
+            if options['category'] is None or options['label'] or options['ids']:
+                raise CommandError('--with-category only applies to a --category alone')
+            try:
+                category = DummyCategory.objects.get(id=options['category'])
+            except DummyCategory.DoesNotExist:
+                raise CommandError(f'Category {options["category"]} does not exist')
+            deleted = delete_category(category, batch_size=options['batch_size'])
+            self.stdout.write(f'{deleted} dummies deleted, along with category {options["category"]}')
+            return
+
+        params = {
+            name: str(options[option]) for name, option in (('category', 'category'), ('label', 'label'), ('id__in', 'ids'))
+            if options[option] is not None
+        }
+        if not params:
+            raise CommandError('Give at least one of --category, --label or --ids')
+        try:
+            filters, ordering = parse_filters(params)
+        except FilterError as e:
+            raise CommandError(str(e))
+
+        deleted = delete_dummies(filters, ordering, batch_size=options['batch_size'])
+        self.stdout.write(f'{deleted} dummies deleted')
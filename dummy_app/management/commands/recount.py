@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dummy_app.counters import recount
+from dummy_app.models import DummyCategory
+
+
+class Command(BaseCommand):
+    help = ('Repair the dummy_count of the categories that drifted from their actual number of dummies, a batch of '
+            'categories per transaction')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of categories recounted per transaction')
+
+    def handle(self, *args, **options):
+        categories = DummyCategory.objects.order_by('id').values_list('id', flat=True)
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            ids = list(categories.filter(id__gt=last_id)[:options['batch_size']])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                repaired += recount(ids)
+            checked += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(f'{checked} categor{"y" if checked == 1 else "ies"} checked, {repaired} counter(s) repaired')
@@ -0,0 +1,74 @@
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+
+from dummy_app.cache import invalidate_categories, invalidate_dummy_list
+from dummy_app.factories import create_categories, create_dummies
+from dummy_app.models import Dummy, DummyCategory
+from dummy_app.search import deferred_search_index
+from users.factories import create_users
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = ('Generate a large dataset of categories, dummies and users for profiling, streamed in chunks so memory '
+            'use stays constant whatever the number of rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=100, help='Number of categories to create')
+        parser.add_argument('--dummies', type=int, default=0, help='Number of dummies, spread over the categories')
+        parser.add_argument('--users', type=int, default=0, help='Number of active users')
+        parser.add_argument('--password', default='password', help='Password of every seeded user')
+        parser.add_argument('--email', default='seed-{}@example.com', help='Email template of the seeded users')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Rows built and committed at a time')
+        parser.add_argument('--clear', action='store_true', help='Delete the existing dummies and categories first')
+        parser.add_argument('--defer-search-index', action='store_true',
+                            help='Drop the full-text index while the dummies are created and build it once at the end, '
+                                 'much faster but searches fail meanwhile: only for a database not serving requests')
+
+    def handle(self, *args, **options):
+        if '{}' not in options['email']:
+            raise CommandError('--email must contain a {} placeholder for the user number')
+
+        if options['clear']:
+            # Raw deletes, the collector would load every row to cascade and send the signals. On the primary: the
+            # alias of a manager is the one it reads from.
+            Dummy.objects.all()._raw_delete(router.db_for_write(Dummy))
+            DummyCategory.objects.all()._raw_delete(router.db_for_write(DummyCategory))
+            invalidate_dummy_list()
+            invalidate_categories()
+            self.stdout.write('Existing dummies and categories deleted')
+
+        category_ids = list(DummyCategory.objects.values_list('id', flat=True))
+        if options['categories']:
+            category_ids += [category.id for category in self.timed(
+                'categories', lambda: create_categories(options['categories'], start=len(category_ids))
+            )]
+
+        if options['dummies']:
+            if not category_ids:
+                raise CommandError('Dummies need at least one category')
+            with deferred_search_index() if options['defer_search_index'] else nullcontext():
+                self.timed('dummies', lambda: create_dummies(
+                    options['dummies'], category_ids, chunk_size=options['chunk_size'], start=Dummy.objects.count()
+                ))
+
+        if options['users']:
+            # Numbered after the users already seeded with the same template, emails are unique
+            prefix = options['email'].split('{}')[0]
+            start = CustomUser.objects.filter(email__startswith=prefix).count()
+            self.timed('users', lambda: create_users(
+                options['users'], chunk_size=options['chunk_size'], password=options['password'],
+                email=options['email'], start=start,
+            ))
+
+    def timed(self, name, create):
+        start = time.perf_counter()
+        result = create()
+        elapsed = time.perf_counter() - start
+
+        rows = result if isinstance(result, int) else len(result)
+        self.stdout.write(f'{rows} {name} created in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)')
+        return result
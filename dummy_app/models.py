@@ -1,17 +1,72 @@
-from django.db import models
+from collections import Counter
+
+from django.conf import settings
+from django.db import models, router, transaction
 
 
 class DummyCategory(models.Model):
     label = models.CharField(max_length=64)
+    # Denormalized number of dummies, kept current by the signals and the bulk paths, repaired by `recount`
+    dummy_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['label'], name='dummycategory_label_idx'),
+        ]
 
     def __str__(self):
         return self.label
 
 
+class DummyQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete through the collector as usual, the `post_delete` receiver tallies the deleted dummies per category in
+        `deleted_counts` and the counters are then decremented with a single UPDATE, in the same transaction
+        """
+
+        from .counters import add_dummy_counts
+
+        self.deleted_counts = Counter()
+        with transaction.atomic(using=self._db or router.db_for_write(self.model, **self._hints), savepoint=False):
+            result = super().delete()
+            add_dummy_counts({pk: -count for pk, count in self.deleted_counts.items()})
+        return result
+
+
 class Dummy(models.Model):
-    label = models.CharField(max_length=128)
+    label = models.CharField(max_length=128, db_collation=settings.DUMMY_LABEL_COLLATION)
     description = models.TextField()
-    category = models.ForeignKey(DummyCategory, on_delete=models.CASCADE)
+    # Indexed by `(category, id)` below, whose prefix serves the plain foreign key lookups as well
+    category = models.ForeignKey(DummyCategory, on_delete=models.CASCADE, db_index=False)
+
+    objects = DummyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Filtering or sorting on a column then paging on the id reads a single index range
+            models.Index(fields=['category', 'id'], name='dummy_category_id_idx'),
+            models.Index(fields=['label', 'id'], name='dummy_label_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The category the row was loaded with, its counter is decremented if the dummy moves to another one. None
+        # when the column is deferred, it is read from the database before a save that may change it.
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
 
     def __str__(self):
         return self.label
+
+
+class ImportCheckpoint(models.Model):
+    """ Number of records of an import committed so far, updated in the transaction of each batch """
+
+    name = models.TextField(unique=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.rows}'
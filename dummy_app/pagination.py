@@ -0,0 +1,191 @@
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import router
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import MAX_INT, MIN_INT
+from .search import ranked_ids
+
+
+def keyset_after(ordering, values):
+    """
+    Condition selecting the rows that come after `values` in `ordering`, e.g. for `('label', 'id')`:
+    `label >= %s AND (label > %s OR id > %s)`. The leading range lets the database seek into an index on the
+    ordering columns instead of scanning them.
+    """
+
+    name, value = ordering[0].lstrip('-'), values[0]
+    op = 'lt' if ordering[0].startswith('-') else 'gt'
+    if len(ordering) == 1:
+        return Q(**{f'{name}__{op}': value})
+    return Q(**{f'{name}__{op}e': value}) & (Q(**{f'{name}__{op}': value}) | keyset_after(ordering[1:], values[1:]))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination, on the primary key unless another `ordering` is given.
+
+    Each page is fetched with `WHERE id > <last seen id> ORDER BY id LIMIT n`, so the cost of a page does not depend
+    on how deep into the table it is. The response body stays a plain list, the next page is advertised through
+    an RFC 8288 `Link` header.
+
+    The last field of the ordering must be unique. `row_key(row)` returns the values of the ordering fields of a row,
+    by default read from model instances, or from `values_list()` rows starting with the id when ordered by id.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+    ordering = ('id',)
+
+    def __init__(self, ordering=None, row_key=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if row_key is not None:
+            self.row_key = row_key
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        after = self.decode_cursor(request)
+        if after is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset.model, after))
+
+        # Fetch one extra row to know whether there is a next page without running a COUNT
+        return queryset.order_by(*self.ordering)[:self.page_size + 1]
+
+    def get_keyset_filter(self, model, after):
+        fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, after)]
+        except (ValidationError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values or any(isinstance(value, int) and not MIN_INT <= value <= MAX_INT for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return keyset_after(self.ordering, values)
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link:
+            headers['Link'] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def row_key(self, row):
+        if isinstance(row, tuple):
+            return row[:1]
+        return tuple(getattr(row, name.lstrip('-')) for name in self.ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.row_key(self.page[-1])))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            values = json.loads(urlsafe_b64decode(encoded + padding))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # `1e400` decodes to an infinite float, which no column holds and integer conversions overflow on
+        if any(isinstance(value, float) and not math.isfinite(value) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, *values):
+        return urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset pagination over full-text search results, ordered by relevance. The cursor holds the `(rank, id)` pair of
+    the last result, the next page is read from the full-text index right after it.
+    """
+
+    search_query_param = 'q'
+    ordering = ('rank', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        hits = self.get_hits(request, queryset.model)
+        return self.set_page(self.sort_rows(hits, queryset.using(self.using).filter(id__in=[pk for _, pk in hits])))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        hits = await sync_to_async(self.get_hits)(request, queryset.model)
+        rows = [row async for row in queryset.using(self.using).filter(id__in=[pk for _, pk in hits])]
+        return self.set_page(self.sort_rows(hits, rows))
+
+    def get_hits(self, request, model):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        # The hits and their rows are read from the same database, two replicas may not be as far along
+        self.using = router.db_for_read(model)
+
+        text = request.query_params.get(self.search_query_param)
+        hits = ranked_ids(text, self.decode_cursor(request), self.page_size + 1, using=self.using)
+        self.has_next = len(hits) > self.page_size
+        self.last_hit = hits[self.page_size - 1] if self.has_next else None
+        return hits[:self.page_size]
+
+    @staticmethod
+    def sort_rows(hits, rows):
+        """ Put the rows, `values_list()` rows starting with the id, back in the order of the hits """
+
+        rows = {row[0]: row for row in rows}
+        return [rows[pk] for _, pk in hits if pk in rows]
+
+    def set_page(self, results):
+        self.page = results
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.last_hit))
+
+    def decode_cursor(self, request):
+        after = super().decode_cursor(request)
+        if after is None:
+            return None
+        rank, last_id = after
+        if not isinstance(rank, (int, float)) or not isinstance(last_id, int) or not MIN_INT <= last_id <= MAX_INT:
+            raise NotFound(self.invalid_cursor_message)
+        return float(rank), last_id
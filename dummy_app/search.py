@@ -0,0 +1,142 @@
+import re
+from contextlib import contextmanager
+from functools import reduce
+from operator import and_
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Dummy
+
+TABLE = Dummy._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+GIN_INDEX = 'dummy_search_idx'
+# Must stay identical to the indexed expression for PostgreSQL to use the GIN index
+DOCUMENT = "to_tsvector('simple', label || ' ' || description)"
+
+# External content FTS5 table, it only stores the index and reads the text back from the Dummy table. The triggers
+# keep it current whatever wrote the rows, the model signals, the bulk paths or raw SQL.
+SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(label, description, content='{TABLE}', content_rowid='id')",
+    # Matches on the label rank above matches on the description
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+)
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+# Created apart from the table: SQLite drops them along with the Dummy table whenever a migration rebuilds it
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_insert': f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, label, description) VALUES (new.id, new.label, new.description);
+    END""",
+    f'{FTS_TABLE}_delete': f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, label, description)
+        VALUES ('delete', old.id, old.label, old.description);
+    END""",
+    f'{FTS_TABLE}_update': f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF label, description ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, label, description)
+        VALUES ('delete', old.id, old.label, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, label, description) VALUES (new.id, new.label, new.description);
+    END""",
+}
+
+# Ranks are negated so that, on every backend, results are sorted by ascending `(rank, id)`
+SQLITE_SEARCH = f"""
+    SELECT rank, rowid FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH %s AND (rank > %s OR (rank = %s AND rowid > %s))
+    ORDER BY rank, rowid LIMIT %s
+"""
+POSTGRESQL_SEARCH = f"""
+    SELECT rank, id FROM (
+        SELECT -ts_rank({DOCUMENT}, query) AS rank, id
+        FROM {TABLE}, plainto_tsquery('simple', %s) AS query
+        WHERE {DOCUMENT} @@ query
+    ) AS hits
+    WHERE rank > %s OR (rank = %s AND id > %s)
+    ORDER BY rank, id LIMIT %s
+"""
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def install_search_index(connection):
+    """
+    Create the full-text index of the Dummy table, or the parts of it that are missing, a no-op on backends without
+    one. On SQLite the index is rebuilt from the table when a trigger was missing, it missed the writes since.
+    """
+
+    tables = connection.introspection.table_names()
+    if TABLE not in tables:
+        return
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            if FTS_TABLE not in tables:
+                for statement in SQLITE_SCHEMA:
+                    cursor.execute(statement)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE])
+            existing = {name for name, in cursor.fetchall()}
+            missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            if missing:
+                cursor.execute(SQLITE_REBUILD)
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {TABLE} USING GIN (({DOCUMENT}))')
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+@contextmanager
+def deferred_search_index(using=None):
+    """
+    Drop the full-text index for the duration of a bulk load and build it again at the end, indexing the whole table
+    at once is about ten times faster than indexing the rows one at a time as they are inserted. Searches fail on
+    SQLite (the index is a table) and scan the table on PostgreSQL until then, only defer it on a database that does
+    not serve requests.
+    """
+
+    connection = connections[using or router.db_for_write(Dummy)]
+    drop_search_index(connection)
+    try:
+        yield
+    finally:
+        install_search_index(connection)
+
+
+def ranked_ids(text, after=None, limit=100, using=None):
+    """
+    Ids of the dummies matching every word of `text`, as `(rank, id)` pairs sorted by relevance, following the
+    `(rank, id)` pair `after` if given, read from the `using` database (the router's pick by default). Backends
+    without a full-text index fall back to a scan sorted by id.
+    """
+
+    terms = search_terms(text)
+    if not terms:
+        return []
+    rank, last_id = after or (float('-inf'), 0)
+
+    using = using or router.db_for_read(Dummy)
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        sql, query = SQLITE_SEARCH, ' '.join(f'"{term}"' for term in terms)
+    elif connection.vendor == 'postgresql':
+        sql, query = POSTGRESQL_SEARCH, ' '.join(terms)
+    else:
+        matches = reduce(and_, (Q(label__icontains=term) | Q(description__icontains=term) for term in terms))
+        ids = Dummy.objects.using(using).filter(matches, id__gt=last_id).order_by('id').values_list('id', flat=True)
+        ids = ids[:limit]
+        return [(0, pk) for pk in ids]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, rank, rank, last_id, limit])
+        return [tuple(row) for row in cursor.fetchall()]
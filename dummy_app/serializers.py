@@ -1,15 +1,177 @@
 from rest_framework import serializers
 
+from config.profiling import timed
+from .bulk import bulk_create_dummies
+from .filters import MAX_INT, MIN_INT
 from .models import Dummy, DummyCategory
 
 
 class DummyCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = DummyCategory
-        fields = '__all__'
+        fields = ('id', 'label')
+
+
+class DummyCategoryStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DummyCategory
+        fields = ('id', 'label', 'dummy_count')
+
+
+def parse_pk(value):
+    """
+    A primary key out of a JSON or form value, an integer or a string of digits within the range of the column.
+    Raises `TypeError` or `ValueError` for anything else, `int()` would truncate floats or overflow on `1e400`.
+    """
+
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(value)
+    pk = int(value)
+    if not MIN_INT <= pk <= MAX_INT:
+        raise ValueError(value)
+    return pk
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """ Resolves categories from the map prefetched by `DummyListSerializer`, falling back to a query per value """
+
+    def to_internal_value(self, data):
+        try:
+            pk = parse_pk(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        categories = self.context.get('categories')
+        if categories is None:
+            return super().to_internal_value(pk)
+        category = categories.get(pk)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
+def referenced_categories(items):
+    """ Ids of the categories referenced by the Dummy payloads `items`, ignoring the invalid ones """
+
+    ids = set()
+    for item in items:
+        try:
+            ids.add(parse_pk(item['category']))
+        except (TypeError, ValueError, KeyError):
+            pass
+    return ids
+
+
+class DummyListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and 'categories' not in self._context:
+            # Resolve every referenced category with a single query instead of one per item
+            self._context['categories'] = DummyCategory.objects.in_bulk(referenced_categories(data))
+        return super().to_internal_value(data)
+
+    @timed('serialize')
+    def to_representation(self, data):
+        return super().to_representation(data)
+
+    def create(self, validated_data):
+        return bulk_create_dummies([Dummy(**attrs) for attrs in validated_data])
 
 
 class DummySerializer(serializers.ModelSerializer):
+    """
+    Accepts two extra arguments for read-only use: `fields`, the names of the fields to output, and `expand`, the
+    relations to output as nested objects instead of primary keys.
+    """
+
+    # Set through the related field class rather than declared, so the fields keep the model's order
+    serializer_related_field = CategoryField
+
+    selectable = ('id', 'label', 'description', 'category')
+    expandable = {
+        'category': DummyCategorySerializer,
+    }
+
     class Meta:
         model = Dummy
         fields = '__all__'
+        list_serializer_class = DummyListSerializer
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in expand:
+            self.fields[name] = self.expandable[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @timed('serialize')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+class DummyValuesSerializer:
+    """
+    Read-only fast path for Dummy lists.
+
+    Rows are built straight from `values_list()` tuples, skipping model instances and serializer fields, and come
+    out exactly as `DummySerializer(instances, many=True, fields=fields, expand=expand).data` would.
+    """
+
+    def __init__(self, fields=None, expand=(), ordering=('id',)):
+        names = [name for name in DummySerializer.selectable if fields is None or name in fields]
+        self.expand_category = 'category' in expand and 'category' in names
+        self.names = [name for name in names if not (self.expand_category and name == 'category')]
+
+        # The id always comes first, the keyset pagination reads it even when it is not part of the output
+        self.columns = ['id', *(name for name in self.names if name != 'id')]
+        self.values = slice(0 if 'id' in self.names else 1, len(self.columns))
+
+        if self.expand_category:
+            # Same fields as `DummyCategorySerializer`, nested as the last key like the expanded `category` field
+            self.category_names = list(DummyCategorySerializer.Meta.fields)
+            self.category_values = slice(len(self.columns), len(self.columns) + len(self.category_names))
+            self.columns += [f'category__{name}' for name in self.category_names]
+
+        # The pagination reads the ordering columns of the last row, those left out of the output are loaded too
+        self.ordering = tuple(ordering)
+        ordering = [name.lstrip('-') for name in ordering]
+        self.columns += [name for name in ordering if name not in self.columns]
+        self.ordering_positions = [self.columns.index(name) for name in ordering]
+
+    def get_queryset(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def ordering_key(self, row):
+        return tuple(row[i] for i in self.ordering_positions)
+
+    @timed('serialize')
+    def to_representation(self, rows):
+        names, values = self.names, self.values
+        if not self.expand_category:
+            return [dict(zip(names, row[values])) for row in rows]
+
+        category_names, category_values = self.category_names, self.category_values
+        return [
+            {**dict(zip(names, row[values])), 'category': dict(zip(category_names, row[category_values]))}
+            for row in rows
+        ]
+
+
+class DummyCategoryValuesSerializer:
+    """
+    Read-only fast path for category lists, rows built straight from `values_list()` tuples that come out exactly as
+    `DummyCategoryStatsSerializer(instances, many=True).data` would
+    """
+
+    # The id comes first, the keyset pagination reads it from the rows
+    names = DummyCategoryStatsSerializer.Meta.fields
+
+    def get_queryset(self, queryset):
+        return queryset.values_list(*self.names)
+
+    @timed('serialize')
+    def to_representation(self, rows):
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
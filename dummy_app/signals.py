@@ -0,0 +1,59 @@
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_categories, invalidate_dummy
+from .counters import add_dummy_counts
+from .models import Dummy, DummyCategory
+from .search import install_search_index
+
+
+@receiver((post_save, post_delete), sender=Dummy, dispatch_uid='dummy_app.invalidate_dummy_cache')
+def invalidate_dummy_cache(sender, instance, **kwargs):
+    invalidate_dummy(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=DummyCategory, dispatch_uid='dummy_app.invalidate_category_cache')
+def invalidate_category_cache(sender, instance, **kwargs):
+    invalidate_categories()
+
+
+@receiver(pre_save, sender=Dummy, dispatch_uid='dummy_app.load_category_id')
+def load_category_id(sender, instance, update_fields=None, **kwargs):
+    # Loaded with a deferred category (`.only()`) which was then set, the previous one is only known to the database
+    deferred = instance.__dict__.get('_loaded_category_id', False) is None
+    saved = update_fields is None or not {'category', 'category_id'}.isdisjoint(update_fields)
+    if deferred and saved and 'category_id' in instance.__dict__:
+        instance._loaded_category_id = (
+            Dummy.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Dummy, dispatch_uid='dummy_app.count_saved_dummy')
+def count_saved_dummy(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_category_id', None)
+    if created:
+        add_dummy_counts({instance.category_id: 1})
+    elif previous is not None and previous != instance.category_id:
+        add_dummy_counts({previous: -1, instance.category_id: 1})
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_delete, sender=Dummy, dispatch_uid='dummy_app.count_deleted_dummy')
+def count_deleted_dummy(sender, instance, origin=None, **kwargs):
+    # Dummies deleted along with their category, the counter goes away with it
+    if isinstance(origin, DummyCategory) or (isinstance(origin, QuerySet) and origin.model is DummyCategory):
+        return
+    # Deleted by `DummyQuerySet.delete()`, which decrements the counters of all its dummies at once
+    deleted_counts = getattr(origin, 'deleted_counts', None)
+    if deleted_counts is not None:
+        deleted_counts[instance.category_id] += 1
+    else:
+        add_dummy_counts({instance.category_id: -1})
+
+
+@receiver(post_migrate, dispatch_uid='dummy_app.install_search_index')
+def create_search_index(sender, app_config, using, **kwargs):
+    if app_config.label == 'dummy_app':
+        install_search_index(connections[using])
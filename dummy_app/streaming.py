@@ -0,0 +1,42 @@
+from itertools import islice
+
+from config.renderers import dumps
+
+
+def chunked(iterable, size):
+    """ Split an iterable into lists of at most `size` items """
+
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def render_chunk(rows, separator):
+    # Encode the whole chunk at once and drop the surrounding brackets
+    return separator + dumps(rows)[1:-1]
+
+
+def stream_json_array(chunks):
+    """ Render an iterable of row lists as a JSON array, one piece per chunk """
+
+    yield b'['
+    separator = b''
+    for rows in chunks:
+        if not rows:
+            continue
+        yield render_chunk(rows, separator)
+        separator = b','
+    yield b']'
+
+
+async def astream_json_array(chunks):
+    """ `stream_json_array()` for an async iterable of row lists """
+
+    yield b'['
+    separator = b''
+    async for rows in chunks:
+        if not rows:
+            continue
+        yield render_chunk(rows, separator)
+        separator = b','
+    yield b']'
@@ -1,12 +1,30 @@
+import asyncio
 import json
+import os
+import tempfile
+from base64 import urlsafe_b64encode
+from io import StringIO
+from unittest import mock, skipUnless
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
+from config.routers import ReplicaRouter
+from config.testing import QueryPlanMixin
 from users.models import CustomUser
-from .models import DummyCategory, Dummy
+from . import bulk, cache as dummy_cache, factories
+from .async_views import AsyncDummyView, AsyncDummyViewProtected
+from .models import DummyCategory, Dummy, ImportCheckpoint
+from .search import SQLITE_TRIGGERS, install_search_index, ranked_ids
+from .serializers import DummyCategoryStatsSerializer, DummySerializer, DummyValuesSerializer
 
 
 class DummyTest(TestCase):
@@ -22,6 +40,79 @@ class DummyTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_get_all_dummies_paginated(self):
+        Dummy.objects.bulk_create([
+            Dummy(label=f"Dummy {i}", description="Description", category=self.category) for i in range(2, 6)
+        ])
+
+        response = self.client.get(self.dummy_url(), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([obj['label'] for obj in response.data], ["Dummy 1", "Dummy 2"])
+
+        labels = []
+        while 'Link' in response:
+            next_url = response['Link'].split(';')[0].strip('<>')
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            labels += [obj['label'] for obj in response.data]
+        self.assertEqual(labels, ["Dummy 3", "Dummy 4", "Dummy 5"])
+
+    def test_get_all_dummies_invalid_cursor(self):
+        response = self.client.get(self.dummy_url(), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for values in ('[1e400]', '[-1e400]', '["one"]'):
+            response = self.client.get(self.dummy_url(), {'cursor': urlsafe_b64encode(values.encode()).decode()})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, values)
+
+    def test_stream_all_dummies(self):
+        Dummy.objects.create(label="Dummy 2", description="Description 2", category=self.category)
+
+        response = self.client.get(self.dummy_url(), {'stream': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([obj['label'] for obj in data], ["Dummy 1", "Dummy 2"])
+        self.assertEqual(data[0], {
+            'id': self.dummy.id, 'label': "Dummy 1", 'description': "Description 1", 'category': self.category.id
+        })
+
+    def test_expand_category(self):
+        categories = DummyCategory.objects.bulk_create([DummyCategory(label=f"Category {i}") for i in range(2, 7)])
+        Dummy.objects.bulk_create([
+            Dummy(label=f"Dummy {i}", description="Description", category=category)
+            for i, category in enumerate(categories, start=2)
+        ])
+        cache.clear()
+
+        # A single joined query, whatever the number of categories
+        with self.assertNumQueries(1):
+            response = self.client.get(self.dummy_url(), {'expand': 'category'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(response.data[0]['category'], {'id': self.category.id, 'label': "Category 1"})
+
+        response = self.client.get(self.dummy_url(self.dummy.id), {'expand': 'category'})
+        self.assertEqual(response.data['category'], {'id': self.category.id, 'label': "Category 1"})
+
+    def test_sparse_fieldset(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.dummy_url(), {'fields': 'id,label'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': self.dummy.id, 'label': "Dummy 1"}])
+        self.assertNotIn('description', queries.captured_queries[-1]['sql'])
+
+        response = self.client.get(self.dummy_url(self.dummy.id), {'fields': 'label,category', 'expand': 'category'})
+        self.assertEqual(response.data, {'label': "Dummy 1", 'category': {'id': self.category.id, 'label': "Category 1"}})
+
+    def test_unknown_fields_or_expansions(self):
+        response = self.client.get(self.dummy_url(), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.dummy_url(), {'expand': 'label'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_single_dummy(self):
         response = self.client.get(self.dummy_url(1))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -46,6 +137,51 @@ class DummyTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 3)
 
+    def test_bulk_create_dummies_query_count(self):
+        other_category = DummyCategory.objects.create(label="Category 2")
+        categories = (self.category.id, other_category.id)
+
+        for size in (3, 30):
+            data = [
+                {'label': f'Dummy Label {i}', 'description': 'Some text', 'category': categories[i % 2]}
+                for i in range(size)
+            ]
+            # One query for the categories, one multi-row INSERT, one UPDATE of the counters, plus the savepoint
+            # around them
+            with self.assertNumQueries(5):
+                response = self.client.post(self.dummy_url(), data=json.dumps(data), content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data), size)
+            self.assertTrue(all(obj['id'] for obj in response.data))
+            self.assertEqual(response.data[1]['category'], other_category.id)
+
+    def test_bulk_create_dummies_per_item_errors(self):
+        data = [
+            {'label': 'Dummy Label 1', 'description': 'Some text', 'category': self.category.id},
+            {'label': 'Dummy Label 2', 'description': 'Some text', 'category': 1000000},
+            {'label': '', 'description': 'Some text', 'category': 'abc'},
+        ]
+        response = self.client.post(self.dummy_url(), data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('category', response.data[1])
+        self.assertEqual(set(response.data[2]), {'label', 'category'})
+        self.assertEqual(Dummy.objects.count(), 1)
+
+        # Categories are integers, not floats nor values out of the range of the column
+        data = [
+            {'label': 'Dummy Label', 'description': 'Some text', 'category': category}
+            for category in (self.category.id + 0.5, '1.5', 2 ** 63, True)
+        ]
+        response = self.client.post(self.dummy_url(), data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(all('category' in errors for errors in response.data))
+        # What the json module parses `1e400` into
+        self.assertFalse(DummySerializer(data=[{**data[0], 'category': float('inf')}], many=True).is_valid())
+
+        response = self.client.post(self.dummy_url(), {**data[0], 'category': self.category.id + 0.5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_dummy_invalid_payload(self):
         data = {'label': '', 'description': 'Some text', 'category': self.category.id}
         response = self.client.post(self.dummy_url(), data)
@@ -68,6 +204,785 @@ class DummyTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class AsyncDummyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.view = AsyncDummyView.as_view()
+
+        self.category = DummyCategory.objects.create(label="Category 1")
+        self.dummy = Dummy.objects.create(label="Dummy 1", description="Description 1", category=self.category)
+
+    async def test_get_all_dummies_paginated(self):
+        await Dummy.objects.abulk_create([
+            Dummy(label=f"Dummy {i}", description="Description", category=self.category) for i in range(2, 6)
+        ])
+
+        response = await self.view(self.factory.get('/dummy/', {'page_size': 3, 'expand': 'category'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual([obj['label'] for obj in data], ["Dummy 1", "Dummy 2", "Dummy 3"])
+        self.assertEqual(data[0]['category'], {'id': self.category.id, 'label': "Category 1"})
+
+        next_url = response['Link'].split(';')[0].strip('<>')
+        response = await self.view(self.factory.get(next_url))
+        self.assertEqual([obj['label'] for obj in json.loads(response.content)], ["Dummy 4", "Dummy 5"])
+        self.assertNotIn('Link', response)
+
+    async def test_stream_all_dummies(self):
+        await Dummy.objects.acreate(label="Dummy 2", description="Description 2", category=self.category)
+
+        view = AsyncDummyView.as_view(stream_chunk_size=1)
+        response = await view(self.factory.get('/dummy/', {'stream': '1', 'fields': 'label'}))
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(content), [{'label': "Dummy 1"}, {'label': "Dummy 2"}])
+
+        # Chunks follow the requested ordering
+        response = await view(self.factory.get('/dummy/', {'stream': '1', 'fields': 'id', 'ordering': '-label'}))
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(json.loads(content)), 2)
+        self.assertEqual(json.loads(content)[1], {'id': self.dummy.id})
+
+    async def test_get_single_dummy(self):
+        response = await self.view(self.factory.get(f'/dummy/{self.dummy.id}/'), pk=self.dummy.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), {
+            'id': self.dummy.id, 'label': "Dummy 1", 'description': "Description 1", 'category': self.category.id
+        })
+
+        # Served from the cache the second time
+        etag = response['ETag']
+        request = self.factory.get(f'/dummy/{self.dummy.id}/', headers={'If-None-Match': etag})
+        response = await self.view(request, pk=self.dummy.id)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.view(self.factory.get('/dummy/1000000/'), pk=1000000)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.view(self.factory.get('/dummy/', {'fields': 'secret'}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_cache_is_used_off_the_event_loop(self):
+        get_cache = dummy_cache.get_cache
+
+        def get_cache_in_thread():
+            with self.assertRaises(RuntimeError):  # No running event loop
+                asyncio.get_running_loop()
+            return get_cache()
+
+        with mock.patch.object(dummy_cache, 'get_cache', get_cache_in_thread):
+            for _ in range(2):
+                response = await self.view(self.factory.get('/dummy/'))
+                self.assertEqual(len(json.loads(response.content)), 1)
+
+    async def test_create_dummy(self):
+        data = {'label': 'Dummy Label', 'description': 'Some text', 'category': self.category.id}
+        response = await self.view(self.factory.post('/dummy/', data))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content)['label'], data['label'])
+
+        data = [data, {**data, 'category': 1000000}]
+        response = await self.view(self.factory.post('/dummy/', data, content_type='application/json'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content)[0], {})
+
+        response = await self.view(self.factory.post('/dummy/', data[:1] * 3, content_type='application/json'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(json.loads(response.content)), 3)
+        self.assertEqual(await Dummy.objects.acount(), 5)
+
+    async def test_delete_dummy(self):
+        response = await self.view(self.factory.delete(f'/dummy/{self.dummy.id}/'), pk=self.dummy.id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = await self.view(self.factory.delete(f'/dummy/{self.dummy.id}/'), pk=self.dummy.id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.view(self.factory.delete('/dummy/'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.view(self.factory.delete(f'/dummy/?category={self.category.id}'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_protected(self):
+        view = AsyncDummyViewProtected.as_view()
+        user = await CustomUser.objects.acreate(email='test@test.com', is_active=True)
+
+        response = await view(self.factory.get('/dummy/protected/'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        response = await view(self.factory.get('/dummy/protected/', headers=headers))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)), 1)
+
+
+class DummyValuesSerializerTest(TestCase):
+    def setUp(self):
+        categories = DummyCategory.objects.bulk_create([DummyCategory(label=f"Catégorie {i}") for i in range(3)])
+        Dummy.objects.bulk_create([
+            Dummy(label=f"Dummy {i} \u2028", description=f"Déscription {i}\n" * i, category=categories[i % 3])
+            for i in range(10)
+        ])
+
+    def test_same_output_as_model_serializer(self):
+        objects = Dummy.objects.order_by('id')
+        for fields in (None, ['id', 'label'], ['label', 'category'], ['description']):
+            for expand in ([], ['category']):
+                with self.subTest(fields=fields, expand=expand):
+                    serializer = DummyValuesSerializer(fields=fields, expand=expand)
+                    self.assertEqual(
+                        json.dumps(serializer.to_representation(serializer.get_queryset(objects))),
+                        json.dumps(DummySerializer(objects, many=True, fields=fields, expand=expand).data),
+                    )
+
+
+class DummyCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dummy_url = lambda pk=None: reverse('dummy-object-view', args=(pk,)) if pk else reverse('dummy-objects-view')
+
+        self.category = DummyCategory.objects.create(label="Category 1")
+        self.dummy = Dummy.objects.create(label="Dummy 1", description="Description 1", category=self.category)
+
+    def test_cached_responses_skip_the_database(self):
+        for url in (self.dummy_url(), self.dummy_url(self.dummy.id)):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_query_params_are_part_of_the_key(self):
+        Dummy.objects.create(label="Dummy 2", description="Description 2", category=self.category)
+
+        self.assertEqual(len(self.client.get(self.dummy_url()).data), 2)
+        self.assertEqual(len(self.client.get(self.dummy_url(), {'page_size': 1}).data), 1)
+
+    def test_origin_is_part_of_the_key(self):
+        Dummy.objects.create(label="Dummy 2", description="Description 2", category=self.category)
+
+        self.assertTrue(self.client.get(self.dummy_url(), {'page_size': 1})['Link'].startswith('<http://testserver/'))
+        response = self.client.get(self.dummy_url(), {'page_size': 1}, secure=True)
+        self.assertTrue(response['Link'].startswith('<https://testserver/'))
+        with self.settings(ALLOWED_HOSTS=['testserver', 'api.example.com']):
+            response = self.client.get(self.dummy_url(), {'page_size': 1}, HTTP_HOST='api.example.com')
+        self.assertTrue(response['Link'].startswith('<http://api.example.com/'))
+
+    def test_writes_invalidate_cached_responses(self):
+        list_etag = self.client.get(self.dummy_url())['ETag']
+        detail_etag = self.client.get(self.dummy_url(self.dummy.id))['ETag']
+
+        data = {'label': 'Dummy Label', 'description': 'Some text', 'category': self.category.id}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.dummy_url(), data)
+        response = self.client.get(self.dummy_url())
+        self.assertEqual(len(response.data), 2)
+        self.assertNotEqual(response['ETag'], list_etag)
+
+        # Other objects keep their cached version
+        self.assertEqual(self.client.get(self.dummy_url(self.dummy.id))['ETag'], detail_etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dummy.label = "Dummy 1 updated"
+            self.dummy.save()
+        response = self.client.get(self.dummy_url(self.dummy.id))
+        self.assertEqual(response.data['label'], "Dummy 1 updated")
+        self.assertNotEqual(response['ETag'], detail_etag)
+
+        # Bulk inserts do not send signals but still invalidate the list
+        list_etag = self.client.get(self.dummy_url())['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.dummy_url(), data=json.dumps([data, data]), content_type='application/json')
+        response = self.client.get(self.dummy_url())
+        self.assertEqual(len(response.data), 4)
+        self.assertNotEqual(response['ETag'], list_etag)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.dummy_url(self.dummy.id))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.dummy_url(self.dummy.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        pk = self.dummy.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dummy.delete()
+        response = self.client.get(self.dummy_url(pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalidation_waits_for_the_commit(self):
+        etag = self.client.get(self.dummy_url(self.dummy.id))['ETag']
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.dummy.label = "Dummy 1 updated"
+            self.dummy.save()
+            # Until the commit, other connections read the old row, the version it is cached under stays current
+            self.assertEqual(self.client.get(self.dummy_url(self.dummy.id))['ETag'], etag)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(self.client.get(self.dummy_url(self.dummy.id))['ETag'], etag)
+
+
+class DummySeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_create_dummies(self):
+        categories = factories.create_categories(3)
+        ids = [category.id for category in categories]
+        self.assertEqual(factories.create_dummies(10, ids, chunk_size=4), 10)
+
+        self.assertEqual(Dummy.objects.count(), 10)
+        self.assertEqual(Dummy.objects.filter(category=categories[0]).count(), 4)
+        self.assertTrue(Dummy.objects.filter(label='Dummy 9', description='Description of dummy 9').exists())
+
+    def test_raw_inserts_invalidate_cached_list(self):
+        category = DummyCategory.objects.create(label="Category 1")
+        self.assertEqual(len(self.client.get(reverse('dummy-objects-view')).data), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.create_dummies(2, [category.id])
+        self.assertEqual(len(self.client.get(reverse('dummy-objects-view')).data), 2)
+
+    def test_seed_command(self):
+        out = StringIO()
+        call_command('seed', categories=2, dummies=5, users=3, stdout=out)
+        self.assertIn('5 dummies created', out.getvalue())
+        self.assertEqual(DummyCategory.objects.count(), 2)
+        self.assertEqual(Dummy.objects.count(), 5)
+        self.assertEqual(CustomUser.objects.filter(email__startswith='seed-').count(), 3)
+
+        # Seeding again appends, emails and labels keep being unique
+        call_command('seed', categories=1, dummies=5, users=3, stdout=out)
+        self.assertEqual(Dummy.objects.values('label').distinct().count(), 10)
+        self.assertEqual(CustomUser.objects.filter(email__startswith='seed-').count(), 6)
+
+        call_command('seed', clear=True, categories=1, dummies=1, defer_search_index=True, stdout=out)
+        self.assertEqual(DummyCategory.objects.count(), 1)
+        self.assertEqual(Dummy.objects.count(), 1)
+        self.assertEqual(len(ranked_ids(Dummy.objects.get().label)), 1)
+
+        with self.assertRaises(CommandError):
+            call_command('seed', categories=0, clear=True, dummies=1, stdout=out)
+
+
+class DummyFilterTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('dummy-objects-view')
+
+        self.categories = factories.create_categories(2)
+        factories.create_dummies(20, [category.id for category in self.categories], label='Dummy {:02}')
+
+    def get_ids(self, **params):
+        """ Ids of every page of the list, following the Link headers """
+
+        ids, url = [], self.url
+        response = self.client.get(url, {'fields': 'id', 'page_size': 3, **params})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            ids += [obj['id'] for obj in response.data]
+            if 'Link' not in response:
+                return ids
+            response = self.client.get(response['Link'].split(';')[0].strip('<>'))
+
+    def test_filters_and_ordering(self):
+        dummies = list(Dummy.objects.order_by('id'))
+        category = self.categories[1].id
+
+        self.assertEqual(self.get_ids(), [dummy.id for dummy in dummies])
+        self.assertEqual(self.get_ids(ordering='-id'), [dummy.id for dummy in reversed(dummies)])
+        self.assertEqual(
+            self.get_ids(ordering='-label'), [dummy.id for dummy in sorted(dummies, key=lambda d: d.label)][::-1]
+        )
+        self.assertEqual(
+            self.get_ids(category=category), [dummy.id for dummy in dummies if dummy.category_id == category]
+        )
+        self.assertEqual(self.get_ids(label='Dummy 1', ordering='label'), [dummy.id for dummy in dummies[10:20]])
+        self.assertEqual(
+            self.get_ids(id__in=f'{dummies[4].id},{dummies[2].id}', ordering='-label'), [dummies[4].id, dummies[2].id]
+        )
+
+        response = self.client.get(self.url, {'category': category, 'fields': 'label', 'expand': 'category'})
+        self.assertEqual({obj['label'] for obj in response.data}, {dummy.label for dummy in dummies[1::2]})
+
+    def test_label_prefix_is_case_sensitive(self):
+        category = self.categories[0]
+        for label in ('ab', 'abc', 'Abc', 'a-bz', 'aB', 'ac'):
+            Dummy.objects.create(label=label, description='', category=category)
+        response = self.client.get(self.url, {'label': 'ab', 'fields': 'label'})
+        self.assertEqual([obj['label'] for obj in response.data], ['ab', 'abc'])
+
+    def test_invalid_filters(self):
+        for params in (
+            {'category': 'one'},
+            {'id__in': '1,two'},
+            {'id__in': ','.join(map(str, range(1001)))},
+            {'ordering': 'description'},
+            {'label': 'Dummy', 'ordering': 'id'},
+            {'category': '1', 'ordering': 'label'},
+            {'category': '1', 'label': 'Dummy', 'ordering': 'label'},
+            {'q': 'dummy', 'category': '1'},
+            {'category': str(10 ** 30)},
+            {'id__in': f'1,{2 ** 63}'},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+        # Looking dummies up by id bounds the result, it combines with any ordering
+        response = self.client.get(self.url, {'id__in': '1', 'label': 'Dummy', 'ordering': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Cursors out of the range of the columns
+        for values in ('[1e400]', f'[{2 ** 63}]', '["Dummy", 1e400]'):
+            cursor = urlsafe_b64encode(values.encode()).decode()
+            ordering = 'label' if len(json.loads(values)) == 2 else 'id'
+            response = self.client.get(self.url, {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, values)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Pins the SQL and the query plans of SQLite')
+    def test_indexed_queries(self):
+        category = self.categories[0].id
+        ids = list(Dummy.objects.order_by('id').values_list('id', flat=True))
+        table = '"dummy_app_dummy"'
+        combinations = (
+            ({}, f'WHERE {table}."id" > {ids[2]} ORDER BY {table}."id" ASC', 'INTEGER PRIMARY KEY'),
+            ({'ordering': '-id'}, f'WHERE {table}."id" < {ids[17]} ORDER BY {table}."id" DESC', 'INTEGER PRIMARY KEY'),
+            (
+                {'ordering': 'label'},
+                f'WHERE ({table}."label" >= \'Dummy 02\' AND '
+                f'({table}."label" > \'Dummy 02\' OR {table}."id" > {ids[2]})) '
+                f'ORDER BY {table}."label" ASC, {table}."id" ASC',
+                'dummy_label_id_idx',
+            ),
+            (
+                {'ordering': '-label'},
+                f'WHERE ({table}."label" <= \'Dummy 17\' AND '
+                f'({table}."label" < \'Dummy 17\' OR {table}."id" < {ids[17]})) '
+                f'ORDER BY {table}."label" DESC, {table}."id" DESC',
+                'dummy_label_id_idx',
+            ),
+            (
+                {'category': category},
+                f'WHERE ({table}."category_id" = {category} AND {table}."id" > {ids[4]}) ORDER BY {table}."id" ASC',
+                'dummy_category_id_idx',
+            ),
+            (
+                {'category': category, 'ordering': '-id'},
+                f'WHERE ({table}."category_id" = {category} AND {table}."id" < {ids[14]}) ORDER BY {table}."id" DESC',
+                'dummy_category_id_idx',
+            ),
+            (
+                {'label': 'Dummy 1', 'ordering': 'label'},
+                f'WHERE ({table}."label" >= \'Dummy 1\' AND {table}."label" < \'Dummy 2\' AND {table}."label" >= '
+                f'\'Dummy 12\' AND ({table}."label" > \'Dummy 12\' OR {table}."id" > {ids[12]})) '
+                f'ORDER BY {table}."label" ASC, {table}."id" ASC',
+                'dummy_label_id_idx',
+            ),
+            (
+                {'id__in': ','.join(map(str, ids[:5])), 'ordering': 'label'},
+                f'WHERE ({table}."id" IN ({", ".join(map(str, ids[:5]))}) AND {table}."label" >= \'Dummy 02\' AND '
+                f'({table}."label" > \'Dummy 02\' OR {table}."id" > {ids[2]})) '
+                f'ORDER BY {table}."label" ASC, {table}."id" ASC',
+                'INTEGER PRIMARY KEY',
+            ),
+        )
+
+        for params, sql, index in combinations:
+            with self.subTest(**params):
+                # The second page, which seeks past the cursor
+                response = self.client.get(self.url, {**params, 'page_size': 3})
+                with CaptureQueriesContext(connection) as context:
+                    self.client.get(response['Link'].split(';')[0].strip('<>'))
+
+                query = context.captured_queries[0]['sql']
+                self.assertTrue(query.endswith(f' FROM {table} {sql} LIMIT 4'), query)
+                self.assertUsesIndex(query, index)
+
+
+class DummyCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=CustomUser.objects.create_user('user@example.com', 'password'))
+        self.categories = factories.create_categories(2)
+
+    def assertCounts(self, *counts):
+        self.assertEqual(
+            list(DummyCategory.objects.order_by('id').values_list('dummy_count', flat=True)), list(counts)
+        )
+
+    def test_counters_follow_writes(self):
+        first, second = self.categories
+        url = reverse('dummy-objects-view')
+
+        self.client.post(url, {'label': 'Dummy', 'description': 'Text', 'category': first.id})
+        self.assertCounts(1, 0)
+
+        data = [{'label': f'Dummy {i}', 'description': 'Text', 'category': (first, second)[i % 2].id} for i in range(5)]
+        self.client.post(url, data=json.dumps(data), content_type='application/json')
+        self.assertCounts(4, 2)
+
+        factories.create_dummies(4, [first.id, second.id])
+        self.assertCounts(6, 4)
+
+        dummy = Dummy.objects.filter(category=first).first()
+        dummy.category = second
+        dummy.save()
+        self.assertCounts(5, 5)
+        dummy.save()
+        self.assertCounts(5, 5)
+
+        # Loaded without its category
+        dummy = Dummy.objects.only('label').get(id=dummy.id)
+        dummy.category = first
+        dummy.save()
+        self.assertCounts(6, 4)
+
+        self.client.delete(reverse('dummy-object-view', args=(dummy.id,)))
+        self.assertCounts(5, 4)
+
+        # One query to collect the dummies, one DELETE, one UPDATE of the counters
+        with self.assertNumQueries(3):
+            Dummy.objects.filter(label__startswith='Dummy').delete()
+        self.assertCounts(0, 0)
+
+        factories.create_dummies(2, [second.id])
+        second.delete()
+        self.assertCounts(0)
+
+    def test_categories_endpoint(self):
+        factories.create_dummies(3, [self.categories[0].id])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dummy-categories-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.categories[0].id, 'label': 'Category 0', 'dummy_count': 3},
+            {'id': self.categories[1].id, 'label': 'Category 1', 'dummy_count': 0},
+        ])
+        self.assertEqual(response.data, DummyCategoryStatsSerializer(DummyCategory.objects.order_by('id'), many=True).data)
+
+        response = self.client.get(reverse('dummy-categories-view'), {'page_size': 1})
+        self.assertEqual([obj['id'] for obj in response.data], [self.categories[0].id])
+        response = self.client.get(response['Link'].split(';')[0].strip('<>'))
+        self.assertEqual([obj['id'] for obj in response.data], [self.categories[1].id])
+        self.assertNotIn('Link', response)
+
+    def test_recount(self):
+        factories.create_dummies(3, [category.id for category in self.categories])
+        DummyCategory.objects.filter(id=self.categories[0].id).update(dummy_count=10)
+        DummyCategory.objects.filter(id=self.categories[1].id).update(dummy_count=-1)
+
+        out = StringIO()
+        call_command('recount', batch_size=1, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '2 categories checked, 2 counter(s) repaired')
+        self.assertCounts(2, 1)
+
+        call_command('recount', stdout=out)
+        self.assertIn('0 counter(s) repaired', out.getvalue())
+
+
+class DummyBulkDeleteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=CustomUser.objects.create_user('user@example.com', 'password'))
+        self.categories = factories.create_categories(2)
+        factories.create_dummies(10, [category.id for category in self.categories], label='Dummy {}')
+
+    def test_delete_by_filters(self):
+        first, second = self.categories
+        url = reverse('dummy-objects-view')
+        dummy = Dummy.objects.filter(category=first).first()
+        self.assertEqual(self.client.get(reverse('dummy-object-view', args=(dummy.id,))).status_code, 200)
+
+        with self.settings(DUMMY_BULK_BATCH_SIZE=2), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'{url}?category={first.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'deleted': 5})
+        self.assertFalse(Dummy.objects.filter(category=first).exists())
+        self.assertEqual(DummyCategory.objects.get(id=first.id).dummy_count, 0)
+        # The cached responses of the deleted dummies are dropped
+        self.assertEqual(self.client.get(reverse('dummy-object-view', args=(dummy.id,))).status_code, 404)
+
+        self.assertEqual(self.client.delete(f'{url}?label=Dummy 1').data, {'deleted': 1})
+        self.assertEqual(self.client.delete(f'{url}?id__in=1000000').data, {'deleted': 0})
+        self.assertEqual(DummyCategory.objects.get(id=second.id).dummy_count, 4)
+
+        for query in ('', '?ordering=-id', '?category=x', f'?category={second.id}&label=Dummy'):
+            self.assertEqual(self.client.delete(f'{url}{query}').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Dummy.objects.count(), 4)
+
+    def test_delete_by_filters_is_restricted(self):
+        url = reverse('dummy-objects-view')
+        with self.settings(DUMMY_BULK_DELETE_MAX_ROWS=4):
+            response = self.client.delete(f'{url}?category={self.categories[0].id}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('delete_dummies command', response.data['error'])
+            self.assertEqual(self.client.delete(f'{url}?label=Dummy 1').data, {'deleted': 1})
+
+        self.client.logout()
+        response = self.client.delete(f'{url}?category={self.categories[0].id}')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Dummy.objects.count(), 9)
+
+    def test_delete_through_the_collector(self):
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.pk)  # noqa: E731
+        post_delete.connect(receiver, sender=Dummy)
+        try:
+            self.assertEqual(bulk.delete_dummies({'category_id': self.categories[0].id}, batch_size=2), 5)
+        finally:
+            post_delete.disconnect(receiver, sender=Dummy)
+        self.assertEqual(len(deleted), 5)
+        self.assertEqual(DummyCategory.objects.get(id=self.categories[0].id).dummy_count, 0)
+
+    def test_delete_category(self):
+        category = self.categories[0]
+        with self.settings(DUMMY_BULK_DELETE_MAX_ROWS=4):
+            response = self.client.delete(reverse('dummy-category-view', args=(category.id,)))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('--with-category', response.data['error'])
+        self.assertEqual(Dummy.objects.count(), 10)
+
+        response = self.client.delete(reverse('dummy-category-view', args=(category.id,)))
+        self.assertEqual(response.data, {'deleted': 5})
+        self.assertFalse(DummyCategory.objects.filter(id=category.id).exists())
+        self.assertEqual(Dummy.objects.count(), 5)
+
+        self.assertEqual(self.client.get(reverse('dummy-category-view', args=(category.id,))).status_code, 404)
+        self.client.logout()
+        self.assertEqual(
+            self.client.delete(reverse('dummy-category-view', args=(self.categories[1].id,))).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_delete_command(self):
+        out = StringIO()
+        call_command('delete_dummies', label='Dummy', batch_size=3, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '10 dummies deleted')
+
+        call_command('delete_dummies', category=self.categories[1].id, with_category=True, stdout=out)
+        self.assertFalse(DummyCategory.objects.filter(id=self.categories[1].id).exists())
+
+        for options in ({}, {'with_category': True}, {'category': 1, 'label': 'Dummy'}):
+            with self.assertRaises(CommandError):
+                call_command('delete_dummies', stdout=out, **options)
+
+
+class DummyTransferTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.categories = factories.create_categories(2)
+        factories.create_dummies(5, [category.id for category in self.categories])
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def export(self, name):
+        call_command('export_dummies', self.path(name), stderr=StringIO())
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_round_trip(self):
+        expected = list(Dummy.objects.order_by('id').values_list('label', 'description', 'category__label'))
+        for name in ('dummies.ndjson', 'dummies.csv'):
+            with self.subTest(name):
+                self.export(name)
+                Dummy.objects.all().delete()
+                DummyCategory.objects.filter(label='Category 1').delete()
+
+                out = StringIO()
+                call_command('import_dummies', self.path(name), batch_size=2, stdout=out)
+                self.assertIn('5 dummies imported', out.getvalue())
+                self.assertEqual(
+                    list(Dummy.objects.order_by('id').values_list('label', 'description', 'category__label')), expected
+                )
+                # Categories are matched by label, and created when missing
+                self.assertEqual(list(DummyCategory.objects.values_list('label', 'dummy_count')), [
+                    ('Category 0', 3), ('Category 1', 2)
+                ])
+                self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_export_to_stdout(self):
+        out, err = StringIO(), StringIO()
+        call_command('export_dummies', format='ndjson', stdout=out, stderr=err)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['category_label'], 'Category 0')
+        self.assertIn('5 dummies exported', err.getvalue())
+
+    def test_resume(self):
+        lines = self.export('dummies.ndjson').splitlines()
+        lines[3] = '{"label": "Broken"'
+        with open(self.path('dummies.ndjson'), 'w') as f:
+            f.write('\n'.join(lines))
+
+        with self.assertRaisesMessage(CommandError, 'Line 4 is not valid JSON'):
+            call_command('import_dummies', self.path('dummies.ndjson'), batch_size=2, stdout=StringIO())
+        # The first batch is committed and checkpointed
+        self.assertEqual(Dummy.objects.count(), 7)
+        self.assertEqual(ImportCheckpoint.objects.get(name=self.path('dummies.ndjson')).rows, 2)
+        with self.assertRaisesMessage(CommandError, 'pass --resume'):
+            call_command('import_dummies', self.path('dummies.ndjson'), stdout=StringIO())
+
+        lines[3] = json.dumps({'label': 'Fixed', 'description': '', 'category_id': 0, 'category_label': 'New'})
+        with open(self.path('dummies.ndjson'), 'w') as f:
+            f.write('\n'.join(lines))
+        out = StringIO()
+        call_command('import_dummies', self.path('dummies.ndjson'), resume=True, stdout=out)
+        self.assertIn('Resuming after 2 rows', out.getvalue())
+        self.assertEqual(Dummy.objects.count(), 10)
+        self.assertTrue(Dummy.objects.filter(label='Fixed', category__label='New').exists())
+
+    def test_invalid_input(self):
+        with open(self.path('dummies.csv'), 'w') as f:
+            f.write('label,description\nDummy,Text\n')
+        with self.assertRaisesMessage(CommandError, 'The CSV header must have the columns'):
+            call_command('import_dummies', self.path('dummies.csv'), stdout=StringIO())
+
+        with open(self.path('dummies.ndjson'), 'w') as f:
+            f.write('{"label": "Dummy"}\n')
+        with self.assertRaisesMessage(CommandError, 'must have the keys'):
+            call_command('import_dummies', self.path('dummies.ndjson'), stdout=StringIO())
+
+
+class DummyDeferredIndexTest(TransactionTestCase):
+    def test_import_with_deferred_indexes(self):
+        category = DummyCategory.objects.create(label='Category 0')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('id,label,description,category_id,category_label\n')
+            f.writelines(f'{i},Dummy {i},Description,{category.id},Category 0\n' for i in range(10))
+            f.flush()
+            # Indexes left dropped by an import killed midway
+            with connection.schema_editor() as editor:
+                editor.remove_index(Dummy, Dummy._meta.indexes[0])
+            call_command('import_dummies', f.name, defer_indexes=True, stdout=StringIO())
+
+        self.assertEqual(Dummy.objects.count(), 10)
+        names = {index.name for index in Dummy._meta.indexes}
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Dummy._meta.db_table)
+        self.assertLessEqual(names, set(constraints))
+        self.assertEqual(len(ranked_ids('dummy 7')), 1)
+
+
+class DummySearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('dummy-objects-view')
+
+        self.category = DummyCategory.objects.create(label="Category 1")
+        self.in_description = Dummy.objects.create(
+            label="Blue widget", description="A red apple", category=self.category
+        )
+        self.in_label = Dummy.objects.create(label="Red apple", description="Fruit", category=self.category)
+        self.pear = Dummy.objects.create(label="Green pear", description="Fruit", category=self.category)
+
+    def search(self, q, **params):
+        return self.client.get(self.url, {'q': q, **params})
+
+    def test_ranked_results(self):
+        response = self.search('apple red')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Label matches rank first
+        self.assertEqual([obj['id'] for obj in response.data], [self.in_label.id, self.in_description.id])
+
+        self.assertEqual(len(self.search('fruit').data), 2)
+        self.assertEqual(self.search('banana').data, [])
+
+        # Without any word to search for, the list is returned
+        for q in ('', '"*'):
+            ids = [obj['id'] for obj in self.search(q).data]
+            self.assertEqual(ids, [self.in_description.id, self.in_label.id, self.pear.id])
+        self.assertEqual(len(self.search('', category=self.category.id).data), 3)
+
+    def test_search_pages(self):
+        ids = []
+        response = self.search('apple', page_size=1, fields='id')
+        while True:
+            self.assertEqual(len(response.data), 1)
+            ids += [obj['id'] for obj in response.data]
+            if 'Link' not in response:
+                break
+            response = self.client.get(response['Link'].split(';')[0].strip('<>'))
+        self.assertEqual(ids, [self.in_label.id, self.in_description.id])
+
+        self.assertEqual(self.search('apple', cursor='invalid').status_code, status.HTTP_404_NOT_FOUND)
+        for values in ('[0, 1e400]', '[1e400, 1]', '[0, 1.5]', f'[0, {2 ** 63}]'):
+            cursor = urlsafe_b64encode(values.encode()).decode()
+            self.assertEqual(self.search('apple', cursor=cursor).status_code, status.HTTP_404_NOT_FOUND, values)
+        self.assertEqual(self.search('apple', stream=1).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_label.label = "Yellow banana"
+            self.in_label.save()
+        self.assertEqual([obj['id'] for obj in self.search('apple').data], [self.in_description.id])
+        self.assertEqual([obj['id'] for obj in self.search('banana').data], [self.in_label.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_description.delete()
+        self.assertEqual(self.search('apple').data, [])
+
+        # Raw inserts skip the model signals, the index is kept by the database
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.create_dummies(3, [self.category.id], label='Bulk apple {}')
+        self.assertEqual(len(self.search('apple').data), 3)
+
+    def test_search_reads_a_single_database(self):
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True, return_value='default') as db_for_read:
+            self.assertEqual(len(self.search('apple').data), 2)
+        self.assertEqual(db_for_read.call_count, 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite drops the triggers of a table it rebuilds')
+    def test_missing_triggers_are_restored(self):
+        # As left by a migration rebuilding the Dummy table
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        missed = Dummy.objects.create(label="Orange", description="Fruit", category=self.category)
+        self.assertEqual(ranked_ids('orange'), [])
+
+        install_search_index(connection)
+        self.assertEqual([pk for _, pk in ranked_ids('orange')], [missed.id])
+        written = Dummy.objects.create(label="Orange juice", description="Drink", category=self.category)
+        self.assertEqual({pk for _, pk in ranked_ids('orange')}, {missed.id, written.id})
+
+    async def test_async_search(self):
+        view = AsyncDummyView.as_view()
+        response = await view(AsyncRequestFactory().get('/dummy/', {'q': 'apple', 'page_size': 1}))
+        self.assertEqual([obj['id'] for obj in json.loads(response.content)], [self.in_label.id])
+        self.assertIn('Link', response)
+
+
+class DummyIndexTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.category = DummyCategory.objects.create(label="Category 1")
+        factories.create_dummies(100, [self.category.id])
+
+    def test_hot_queries_use_indexes(self):
+        self.assertUsesIndex(DummyCategory.objects.filter(label="Category 1"), 'dummycategory_label_idx')
+        self.assertUsesIndex(
+            Dummy.objects.filter(category=self.category, id__gt=10).order_by('id')[:20], 'dummy_category_id_idx'
+        )
+        self.assertUsesIndex(Dummy.objects.filter(label='Dummy 1').order_by('id'), 'dummy_label_id_idx')
+
+        # Deleting a category looks its dummies up through the composite index too
+        with CaptureQueriesContext(connection) as context:
+            list(Dummy.objects.filter(category_id=self.category.id).values_list('id', flat=True))
+        self.assertUsesIndex(context.captured_queries[0]['sql'], 'dummy_category_id_idx')
+
+
 class DummyProtectedTest(TestCase):
     def setUp(self):
         self.client = APIClient()
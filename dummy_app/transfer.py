@@ -0,0 +1,147 @@
+import csv
+import os
+from itertools import islice
+from operator import itemgetter
+
+from django.db import transaction
+
+from config.renderers import dumps
+from .bulk import insert_dummy_rows
+from .models import Dummy, DummyCategory
+from .streaming import chunked
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+# Columns of the exported records. The category travels with its id and label, imports map the id to a category of
+# the target database with the same label, created if there is none.
+FIELDS = ('id', 'label', 'description', 'category_id', 'category_label')
+IMPORT_FIELDS = FIELDS[1:]
+FORMATS = ('ndjson', 'csv')
+EXTENSIONS = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def guess_format(path):
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'ndjson')
+
+
+def export_rows(chunk_size=2000):
+    """ Every dummy as a tuple of `FIELDS`, read by chunks through a server-side cursor where the backend has one """
+
+    return (
+        Dummy.objects.order_by('id')
+        .values_list('id', 'label', 'description', 'category_id', 'category__label')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def write_records(rows, out, fmt, chunk_size=2000):
+    """ Write the rows to the text stream `out` a chunk at a time, returns the number of rows written """
+
+    written = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        for chunk in chunked(rows, chunk_size):
+            writer.writerows(chunk)
+            written += len(chunk)
+    else:
+        for chunk in chunked(rows, chunk_size):
+            out.write(''.join(dumps(dict(zip(FIELDS, row))).decode() + '\n' for row in chunk))
+            written += len(chunk)
+    return written
+
+
+def read_records(lines, fmt, chunk_size=5000):
+    """
+    `(label, description, category_id, category_label)` tuples out of an NDJSON or CSV text stream, read lazily.
+    NDJSON lines are parsed a chunk at a time, as a single JSON array, to save a call per line.
+    """
+
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        try:
+            get = itemgetter(*(header.index(name) for name in IMPORT_FIELDS))
+        except ValueError:
+            raise RecordError(f"The CSV header must have the columns {', '.join(IMPORT_FIELDS)}")
+        try:
+            yield from map(get, reader)
+        except IndexError:
+            raise RecordError(f'Line {reader.line_num} has missing columns')
+        return
+
+    get = itemgetter(*IMPORT_FIELDS)
+
+    def fields(records, first, last):
+        try:
+            yield from map(get, records)
+        except (KeyError, TypeError):
+            raise RecordError(f"Every record of lines {first} to {last} must have the keys {', '.join(IMPORT_FIELDS)}")
+
+    number = 0
+    for chunk in chunked(lines, chunk_size):
+        try:
+            records = loads('[' + ','.join(filter(str.strip, chunk)) + ']')
+        except ValueError:
+            # Parse the chunk again line by line, to hand over the records before the culprit and point at it
+            records = []
+            for offset, line in enumerate(chunk, start=number + 1):
+                try:
+                    if line.strip():
+                        records.append(loads(line))
+                except ValueError as e:
+                    yield from fields(records, number + 1, offset - 1)
+                    raise RecordError(f'Line {offset} is not valid JSON: {e}')
+            raise
+        yield from fields(records, number + 1, number + len(chunk))
+        number += len(chunk)
+
+
+class CategoryMap:
+    """
+    Maps the category ids of the source to categories of this database, matched by label, created when missing.
+    Holds one entry per category, so memory does not grow with the number of dummies.
+    """
+
+    def __init__(self):
+        # The oldest category wins when several share a label
+        self.by_label = dict(DummyCategory.objects.order_by('-id').values_list('label', 'id'))
+        self.ids = {}
+
+    def resolve(self, source_id, label):
+        key = source_id if source_id not in (None, '') else label
+        if key not in self.ids:
+            if label not in self.by_label:
+                self.by_label[label] = DummyCategory.objects.create(label=label).id
+            self.ids[key] = self.by_label[label]
+        return self.ids[key]
+
+
+def import_records(records, batch_size=50000, skip=0, on_batch=None):
+    """
+    Insert the dummies of the `read_records()` tuples a batch at a time, each batch in its own transaction along
+    with the categories it creates. The first `skip` records, imported by an earlier run, are passed over.
+    `on_batch(imported)` is called inside the transaction of each batch with the total number of records handled,
+    progress it records commits along with the rows. Returns the number of records imported by this run.
+    """
+
+    categories = CategoryMap()
+    ids, resolve = categories.ids, categories.resolve
+    imported = 0
+    for batch in chunked(islice(records, skip, None), batch_size):
+        with transaction.atomic():
+            insert_dummy_rows([
+                (label, description, ids[source_id] if source_id in ids else resolve(source_id, category_label))
+                for label, description, source_id, category_label in batch
+            ])
+            imported += len(batch)
+            if on_batch is not None:
+                on_batch(skip + imported)
+    return imported
@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import DummyView, DummyViewProtected
+from .async_views import AsyncDummyView, AsyncDummyViewProtected
+from .views import DummyCategoryView, DummyView, DummyViewProtected
+
+if settings.DUMMY_ASYNC_VIEWS:
+    dummy_view, dummy_view_protected = AsyncDummyView.as_view(), AsyncDummyViewProtected.as_view()
+else:
+    dummy_view, dummy_view_protected = DummyView.as_view(), DummyViewProtected.as_view()
 
 urlpatterns = [
-    path('dummy/', DummyView.as_view(), name='dummy-objects-view'),
-    path('dummy/<int:pk>/', DummyView.as_view(), name='dummy-object-view'),
-    path('dummy/protected/', DummyViewProtected.as_view(), name='dummy-objects-protected-view'),
-    path('dummy/<int:pk>/protected/', DummyViewProtected.as_view(), name='dummy-object-protected-view'),
-]
\ No newline at end of file
+    path('dummy/', dummy_view, name='dummy-objects-view'),
+    path('dummy/<int:pk>/', dummy_view, name='dummy-object-view'),
+    path('dummy/protected/', dummy_view_protected, name='dummy-objects-protected-view'),
+    path('dummy/<int:pk>/protected/', dummy_view_protected, name='dummy-object-protected-view'),
+    path('categories/', DummyCategoryView.as_view(), name='dummy-categories-view'),
+    path('categories/<int:pk>/', DummyCategoryView.as_view(), name='dummy-category-view'),
+]
@@ -1,28 +1,117 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Dummy
-from .serializers import DummySerializer
+from .bulk import delete_category, delete_dummies
+from .cache import cache_response
+from .filters import FILTER_PARAMS, FilterError, parse_filters
+from .models import Dummy, DummyCategory
+from .pagination import KeysetPagination, SearchPagination
+from .search import search_terms
+from .serializers import DummyCategoryStatsSerializer, DummyCategoryValuesSerializer, DummySerializer, DummyValuesSerializer
+from .streaming import chunked, stream_json_array
 
 
 class DummyView(APIView):
     permission_classes = (AllowAny,)
+    pagination_class = KeysetPagination
+    search_pagination_class = SearchPagination
+    stream_chunk_size = 2000
 
+    @cache_response
     def get(self, request, pk=None):
+        serializer_kwargs, error = self.get_serializer_kwargs(request)
+        if error:
+            return error
+        objects = self.get_queryset(**serializer_kwargs)
 
         if pk:
             try:
-                queryset = Dummy.objects.get(id=pk)
-                serializer = DummySerializer(queryset)
+                queryset = objects.get(id=pk)
+                serializer = DummySerializer(queryset, **serializer_kwargs)
                 return Response(serializer.data)
             except Dummy.DoesNotExist:
                 return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
         else:
-            objects = Dummy.objects.all()
-            serializer = DummySerializer(objects, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            filters, ordering, error = self.get_filters(request)
+            if error:
+                return error
+            serializer = DummyValuesSerializer(**serializer_kwargs, ordering=ordering)
+            rows = serializer.get_queryset(objects.filter(**filters).order_by(*ordering))
+
+            paginator = self.get_paginator(request, serializer)
+            if request.query_params.get('stream') in ('1', 'true'):
+                if isinstance(paginator, self.search_pagination_class):
+                    return Response({"error": "Search results can not be streamed"}, status=status.HTTP_400_BAD_REQUEST)
+                return self.stream(rows, serializer)
+
+            page = paginator.paginate_queryset(rows, request, view=self)
+            return paginator.get_paginated_response(serializer.to_representation(page))
+
+    def get_serializer_kwargs(self, request):
+        """ Sparse fieldset (`?fields=id,label`) and nested expansions (`?expand=category`), or an error response """
+
+        fields = self.parse_list_param(request, 'fields')
+        expand = self.parse_list_param(request, 'expand')
+        unknown = (set(fields or ()) - set(DummySerializer.selectable)) | (set(expand) - set(DummySerializer.expandable))
+        if unknown:
+            error = Response({"error": f"Unknown field(s): {', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST)
+            return None, error
+        if fields is not None:
+            expand = [name for name in expand if name in fields]
+        return {'fields': fields, 'expand': expand}, None
+
+    def get_filters(self, request):
+        """ Whitelisted filters and ordering of the list (`?category=1&ordering=-id`), or an error response """
+
+        params = request.query_params
+        if self.is_search(request) and any(name in params for name in FILTER_PARAMS):
+            error = Response({"error": "Search results can not be filtered or ordered"}, status=status.HTTP_400_BAD_REQUEST)
+            return None, None, error
+        try:
+            filters, ordering = parse_filters(params)
+        except FilterError as e:
+            return None, None, Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return filters, ordering, None
+
+    def get_paginator(self, request, serializer):
+        """ Full-text search results (`?q=`) are paged by relevance, the list by its ordering """
+
+        if self.is_search(request):
+            return self.search_pagination_class()
+        return self.pagination_class(serializer.ordering, row_key=serializer.ordering_key)
+
+    def is_search(self, request):
+        # A query without any word to search for (`?q=`) lists the dummies
+        return bool(search_terms(request.query_params.get(self.search_pagination_class.search_query_param)))
+
+    @staticmethod
+    def parse_list_param(request, name):
+        value = request.query_params.get(name)
+        if value is None:
+            return None if name == 'fields' else []
+        return [item for item in value.split(',') if item]
+
+    def get_queryset(self, fields=None, expand=()):
+        """ Only load the columns the response needs, and join the expanded relations instead of querying them """
+
+        queryset = Dummy.objects.all()
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields is not None:
+            # The primary key is always needed, the keyset pagination pages on it
+            queryset = queryset.only('id', *fields)
+        return queryset
+
+    def stream(self, rows, serializer):
+        """ Send the whole list as a chunked JSON array, holding a single chunk of rows in memory at a time """
+
+        rows = rows.iterator(chunk_size=self.stream_chunk_size)
+        chunks = (serializer.to_representation(chunk) for chunk in chunked(rows, self.stream_chunk_size))
+        return StreamingHttpResponse(stream_json_array(chunks), content_type='application/json')
 
     def post(self, request):
         if isinstance(request.data, list):
@@ -45,7 +134,64 @@ class DummyView(APIView):
                 return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
+            return self.bulk_delete(request)
+
+    def bulk_delete(self, request):
+        """
+        Delete every dummy matching the filters, a batch per transaction. Reserved to authenticated users, and bounded
+        to `DUMMY_BULK_DELETE_MAX_ROWS` dummies so the request stays short, the `delete_dummies` command takes over
+        beyond that.
+        """
+
+        filters, ordering, error = self.get_filters(request)
+        if error:
+            return error
+        if not filters:
             return Response({'error': 'Missing 1 expected parameter PK'}, status=status.HTTP_400_BAD_REQUEST)
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+
+        limit = settings.DUMMY_BULK_DELETE_MAX_ROWS
+        # Walks at most `limit` entries of the index serving the filters, instead of counting every match
+        if Dummy.objects.filter(**filters).order_by(*ordering)[limit:limit + 1].exists():
+            error = f'More than {limit} dummies match, delete them with the delete_dummies command'
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'deleted': delete_dummies(filters, ordering)}, status=status.HTTP_200_OK)
+
 
 class DummyViewProtected(DummyView):
     permission_classes = (IsAuthenticated,)
+
+
+class DummyCategoryView(APIView):
+    """ Categories with their number of dummies, read from the counter they hold instead of counting the dummies """
+
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = KeysetPagination
+
+    def get(self, request, pk=None):
+        if pk:
+            try:
+                return Response(DummyCategoryStatsSerializer(DummyCategory.objects.get(id=pk)).data)
+            except DummyCategory.DoesNotExist:
+                return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = DummyCategoryValuesSerializer()
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(serializer.get_queryset(DummyCategory.objects.all()), request, view=self)
+        return paginator.get_paginated_response(serializer.to_representation(page))
+
+    def delete(self, request, pk):
+        """ Delete a category and its dummies, bounded to `DUMMY_BULK_DELETE_MAX_ROWS` dummies like `bulk_delete()` """
+
+        try:
+            category = DummyCategory.objects.get(id=pk)
+        except DummyCategory.DoesNotExist:
+            return Response({"error": "Object not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        limit = settings.DUMMY_BULK_DELETE_MAX_ROWS
+        if Dummy.objects.filter(category_id=category.id).order_by('id')[limit:limit + 1].exists():
+            error = f'More than {limit} dummies in the category, delete it with delete_dummies --with-category'
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        # The dummies are deleted by batches first, instead of all at once by the cascade
+        return Response({'deleted': delete_category(category)}, status=status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from users.models import CustomUser
+from users.models import CustomUser, OutboundEmail
 
 # Register your models here.
-admin.site.register(CustomUser)
\ No newline at end of file
+admin.site.register(CustomUser)
+admin.site.register(OutboundEmail)
@@ -0,0 +1,149 @@
+"""
+Async versions of the views hashing passwords, served instead of the DRF ones when `USERS_ASYNC_VIEWS` is enabled.
+
+Under ASGI the password hashing would block the event loop, and with it every other request of the worker, so it
+runs in the bounded `users.hashers.hashing_pool`. When the pool is saturated, by a credential stuffing burst for
+instance, the views answer 503 with a `Retry-After` header right away instead of queueing more work. Like the DRF
+views, they are throttled by `users.throttling` before anything else.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.tokens import default_token_generator
+from django.http import JsonResponse
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import Throttled
+
+from . import hashers
+from .mail import enqueue_mail, verification_mail
+from .models import CustomUser
+from .serializers import UserSerializer
+from .throttling import IPThrottle, athrottle_wait
+from .tokens import FastBlacklistRefreshToken
+
+
+def request_data(request):
+    """ Body of a JSON or form encoded request """
+
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+
+def pool_saturated():
+    response = JsonResponse({"error": "Too many requests, please retry later."}, status=503)
+    response['Retry-After'] = str(settings.PASSWORD_HASHING_RETRY_AFTER)
+    return response
+
+
+def throttled(wait):
+    """ Same rejection as DRF's for the throttled requests """
+
+    exception = Throttled(wait)
+    response = JsonResponse({'detail': exception.detail}, status=exception.status_code)
+    response['Retry-After'] = str(exception.wait)
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def signup(request):
+    data = request_data(request)
+    if (wait := await athrottle_wait(request, 'signup', data, (IPThrottle,))) is not None:
+        return throttled(wait)
+
+    serializer = UserSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        password = await hashers.hashing_pool.run(make_password, serializer.validated_data['password'])
+    except hashers.PoolSaturated:
+        return pool_saturated()
+
+    user = await CustomUser.objects.acreate(
+        email=CustomUser.objects.normalize_email(serializer.validated_data['email']),
+        password=password,
+    )
+
+    # Queue the verification email
+    subject, message = verification_mail(user, request.build_absolute_uri)
+    await sync_to_async(enqueue_mail)(subject, message, settings.EMAIL_HOST_USER, [user.email])
+
+    return JsonResponse({
+        "message": "User created. Please check your email to verify your account."
+    }, status=201)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = request_data(request)
+    if (wait := await athrottle_wait(request, 'login', data)) is not None:
+        return throttled(wait)
+
+    email, password = data.get('email'), data.get('password')
+    user = await CustomUser.objects.filter(email=email).afirst() if email else None
+
+    try:
+        if user is None:
+            # Hash anyway so that unknown emails take as long as wrong passwords, like `ModelBackend`
+            await hashers.hashing_pool.run(make_password, password)
+            is_correct = False
+        else:
+            is_correct, must_update = await hashers.hashing_pool.run(verify_password, password, user.password)
+
+            # Upgrade the hash made with outdated parameters, as `check_password()` does
+            if is_correct and must_update:
+                user.password = await hashers.hashing_pool.run(make_password, password)
+                await user.asave(update_fields=['password'])
+    except hashers.PoolSaturated:
+        return pool_saturated()
+
+    if is_correct and user.is_active:
+        refresh = await sync_to_async(FastBlacklistRefreshToken.for_user)(user)
+        return JsonResponse({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }, status=200)
+    return JsonResponse({"error": "Invalid credentials"}, status=401)
+
+
+@csrf_exempt
+@require_POST
+async def password_reset_confirm(request, uidb64, token):
+    data = request_data(request)
+    if (wait := await athrottle_wait(request, 'password_reset_confirm', data, (IPThrottle,))) is not None:
+        return throttled(wait)
+
+    # Check the existence of the user
+    try:
+        uid = force_str(urlsafe_base64_decode(uidb64))
+        user = await CustomUser.objects.aget(pk=uid)
+    except CustomUser.DoesNotExist:
+        return JsonResponse({"error": "Invalid reset link."}, status=400)
+
+    # Validate the token and update the user
+    if default_token_generator.check_token(user, token):
+
+        # Check the password is not empty
+        password = data.get('password')
+        if not password:
+            return JsonResponse({"error": "Password is required."}, status=400)
+
+        try:
+            user.password = await hashers.hashing_pool.run(make_password, password)
+        except hashers.PoolSaturated:
+            return pool_saturated()
+        await user.asave()
+        return JsonResponse({"message": "Password has been reset successfully."}, status=200)
+
+    return JsonResponse({"error": "Invalid token or expired link."}, status=400)
@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import TTLCache
+
+# Raw token -> validated token, so a token's signature and claims are verified once
+token_cache = TTLCache(settings.JWT_AUTH_CACHE_SIZE, settings.JWT_AUTH_CACHE_TTL)
+
+# User id -> slim user snapshot, evicted by `users.signals` whenever the user is saved or deleted
+user_cache = TTLCache(settings.JWT_AUTH_CACHE_SIZE, settings.JWT_AUTH_CACHE_TTL)
+
+
+class UserSnapshot:
+    """
+    Stand-in for `CustomUser` holding what authentication and the usual permission checks need. Any other
+    attribute (`has_perm`, `groups`, ...) loads the full user from the database on first access.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, email, is_active, is_staff, password_hash):
+        self.id = id
+        self.email = email
+        self.is_active = is_active
+        self.is_staff = is_staff
+        self.password_hash = password_hash
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __getattr__(self, name):
+        # Dunder and private names are looked up by copy, pickle and the like, often before `__init__` ran
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self.__dict__.get('_user')
+        if user is None:
+            from .models import CustomUser
+            user = self.__dict__['_user'] = CustomUser.objects.get(pk=self.id)
+        return getattr(user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and getattr(other, 'is_authenticated', False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.email
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` keeping verified tokens and user snapshots in bounded in-process caches, so that in the
+    steady state authenticating a request runs no database query and no signature check.
+
+    Saving or deleting a user evicts its snapshot in the current process; other processes pick the change up once
+    their entry expires, after at most `JWT_AUTH_CACHE_TTL` seconds. `QuerySet.update()` sends no signal, a user
+    deactivated through it is only seen once the entry expires, in every process, unless it is evicted by hand
+    (`user_cache.delete(pk)`).
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            # Never keep a token past its expiration
+            token_cache.set(raw_token, validated_token, ttl=validated_token['exp'] - time.time())
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            user = (
+                self.user_model.objects
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values('id', 'email', 'is_active', 'is_staff', 'password')
+                .first()
+            )
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+            snapshot = (
+                user['id'], user['email'], user['is_active'], user['is_staff'], get_md5_hash_password(user['password'])
+            )
+            user_cache.set(user_id, snapshot)
+
+        user = UserSnapshot(*snapshot)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user.password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
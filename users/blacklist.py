@@ -0,0 +1,134 @@
+import math
+import threading
+import time
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+# Bumped each time a token is blacklisted, tells every process its index is missing entries
+GENERATION_KEY = 'jwt:blacklist:generation'
+# The jti blacklisted by each generation, so that a process catching up reads the new jtis from the cache
+JTI_KEY = 'jwt:blacklist:jti:{}'
+# Generations a process catches up on through the cache, beyond that it reloads the database rows
+MAX_PENDING = 1000
+
+
+class BloomFilter:
+    """ Fixed-size Bloom filter over strings: no false negatives, about `error_rate` false positives """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, value):
+        digest = blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistIndex:
+    """
+    In-process Bloom filter of the blacklisted jtis, kept in sync with the database through a generation counter
+    in the shared cache.
+
+    A jti missing from the filter is certainly not blacklisted, which is the answer for nearly every refresh, so the
+    database is only asked on the rare filter hits. Blacklisting a token publishes its jti under a new generation
+    once the row is committed, the other processes read the jtis of the generations they missed from the cache.
+    When one of them is missing (evicted, or not written yet) the filter is rebuilt from the database, which holds
+    every published row, so the sync never depends on the order rows are committed in. The filter is also rebuilt
+    every `JWT_BLACKLIST_INDEX_MAX_AGE` seconds, which drops the pruned tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._generation = None
+        self._built_at = 0.0
+
+    @property
+    def cache(self):
+        return caches[settings.JWT_BLACKLIST_CACHE_ALIAS]
+
+    def current_generation(self):
+        generation = self.cache.get(GENERATION_KEY)
+        if generation is None:
+            # Lost to an eviction or a flush, start a new generation every process will sync against
+            self.cache.add(GENERATION_KEY, time.time_ns(), None)
+            generation = self.cache.get(GENERATION_KEY)
+        return generation
+
+    def publish(self, jti):
+        """ Tell every process `jti` was blacklisted, to be called once the row is committed """
+
+        try:
+            generation = self.cache.incr(GENERATION_KEY)
+        except ValueError:
+            # A new generation with no jti, every process rebuilds
+            self.cache.set(GENERATION_KEY, time.time_ns(), None)
+            return
+        self.cache.set(JTI_KEY.format(generation), jti, settings.JWT_BLACKLIST_INDEX_MAX_AGE)
+
+    def sync(self):
+        # The generation is read before the jtis or the rows, a token blacklisted in between is picked up next time
+        generation = self.current_generation()
+        with self._lock:
+            if (self._filter is None or time.monotonic() - self._built_at > settings.JWT_BLACKLIST_INDEX_MAX_AGE
+                    or not self._catch_up(generation)):
+                self._rebuild()
+            self._generation = generation
+
+    def _catch_up(self, generation):
+        """ Add the jtis published since the last sync, returns False when some are not in the cache """
+
+        if generation == self._generation:
+            return True
+        if not 0 < generation - self._generation <= MAX_PENDING:
+            return False
+        keys = [JTI_KEY.format(missed) for missed in range(self._generation + 1, generation + 1)]
+        jtis = self.cache.get_many(keys)
+        if len(jtis) < len(keys):
+            return False
+        for jti in jtis.values():
+            self._filter.add(jti)
+        return True
+
+    def _rebuild(self):
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        self._filter = BloomFilter(max(settings.JWT_BLACKLIST_INDEX_CAPACITY, live.count() * 2))
+        for jti in live.values_list('token__jti', flat=True).iterator(chunk_size=5000):
+            self._filter.add(jti)
+        self._built_at = time.monotonic()
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self._filter
+
+
+index = BlacklistIndex()
+
+
+def is_blacklisted(jti):
+    """ Whether the refresh token `jti` was blacklisted, hitting the database only when it may be """
+
+    if settings.JWT_BLACKLIST_FAST_CHECK and not index.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
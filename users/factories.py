@@ -0,0 +1,30 @@
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import CustomUser
+
+
+def build_users(count, password='password', email='user{}@example.com', start=0, **fields):
+    """
+    Lazily build `count` unsaved users sharing a single password hash, hashing is by design far too slow to be done
+    once per user (`create_user()` costs hundreds of milliseconds per row)
+    """
+
+    password = make_password(password)
+    fields.setdefault('is_active', True)
+    for i in range(start, start + count):
+        yield CustomUser(email=email.format(i), password=password, **fields)
+
+
+def create_users(count, chunk_size=50000, batch_size=1000, **kwargs):
+    """ Insert `count` users a chunk at a time, keeping memory use constant, returns the number of rows inserted """
+
+    users = build_users(count, **kwargs)
+    created = 0
+    while chunk := list(islice(users, chunk_size)):
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(chunk, batch_size=batch_size)
+        created += len(chunk)
+    return created
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2-SHA256 hasher with the iteration count read from `PASSWORD_PBKDF2_ITERATIONS`.
+
+    The algorithm name is unchanged, so the existing hashes still verify, and the ones made with another iteration
+    count are rehashed on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """ Django's Argon2id hasher with its cost parameters read from the `PASSWORD_ARGON2_*` settings """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class PoolSaturated(Exception):
+    """ Raised when the hashing pool already has as much work as it accepts """
+
+
+class BoundedExecutor:
+    """
+    Thread pool accepting at most `max_workers + queue_size` tasks at once, further submissions raise `PoolSaturated`
+    instead of queueing without bound.
+
+    Threads are enough for hashing: `hashlib.pbkdf2_hmac` and argon2-cffi both release the GIL while they run.
+    """
+
+    def __init__(self, max_workers, queue_size):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """ Run `fn` in the pool without blocking the event loop """
+
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+hashing_pool = BoundedExecutor(
+    settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 1,
+    settings.PASSWORD_HASHING_QUEUE_SIZE,
+)
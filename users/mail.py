@@ -0,0 +1,274 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def verification_mail(user, build_absolute_uri):
+    """ Subject and body of the email verification mail, links are made absolute by `build_absolute_uri` """
+
+    # Generate email verification token and link
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    verification_link = build_absolute_uri(
+        reverse('email-verification-view', kwargs={'uidb64': uid, 'token': token})
+    )
+    return "Verify Your Email Address", f"Click the link to verify your email: {verification_link}"
+
+
+def password_reset_mail(user, build_absolute_uri):
+    """ Subject and body of the password reset mail, links are made absolute by `build_absolute_uri` """
+
+    # Generate reset token and link
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_link = build_absolute_uri(
+        reverse('password-reset-confirm-view', kwargs={'uidb64': uid, 'token': token})
+    )
+    return "Reset Your Password", f"Click the link to reset your password: {reset_link}"
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """ Store an email in the outbox, the `send_queued_mail` worker takes care of the delivery """
+
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """ Exponential backoff between two delivery attempts of the same email """
+
+    return timedelta(seconds=min(
+        settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_QUEUE_MAX_RETRY_DELAY,
+    ))
+
+
+def claim_batch(batch_size):
+    """
+    Lease the next due emails to the current worker.
+
+    The lease pushes `next_attempt_at` forward so concurrent workers skip the claimed rows, an email whose worker
+    died mid-batch simply becomes due again once the lease expires.
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE)
+        )
+    return batch
+
+
+def deliver_queued_mail(connection=None, batch_size=100):
+    """
+    Send one batch of due emails over a single connection and record the outcome of each one.
+
+    Returns a `(sent, failed)` tuple, `failed` counting the emails rescheduled or given up on.
+    """
+
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    try:
+        # Keep the connection open across the whole batch, `close()` is left to the caller
+        connection.open()
+    except Exception:
+        # Each message retries the connection and records the failure on its own
+        pass
+
+    sent, failed = [], []
+    for email in batch:
+        message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+        try:
+            message.send()
+        except Exception as e:
+            # Drop the connection, the next message reopens a fresh one
+            connection.close()
+            email.last_error = str(e) or e.__class__.__name__
+            failed.append(email)
+        else:
+            sent.append(email)
+
+    now = timezone.now()
+    OutboundEmail.objects.filter(pk__in=[email.pk for email in sent]).update(
+        status=OutboundEmail.STATUS_SENT, sent_at=now, last_error=''
+    )
+    for email in failed:
+        email.attempts += 1
+        if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+            email.status = OutboundEmail.STATUS_FAILED
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    OutboundEmail.objects.bulk_update(failed, ['attempts', 'status', 'next_attempt_at', 'last_error'])
+
+    return len(sent), len(failed)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of long-lived email backend connections.
+
+    Connections are opened lazily, up to `size` of them, and handed back to the pool after each use so the SMTP
+    handshake (and the TLS one when `EMAIL_USE_TLS` is on) is paid once per connection instead of once per message.
+    """
+
+    def __init__(self, size=None, backend=None, **kwargs):
+        self.size = size or settings.EMAIL_POOL_SIZE
+        self.backend = backend
+        self.kwargs = kwargs
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = []
+
+    @contextmanager
+    def connection(self):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._create() or self._idle.get()
+
+        try:
+            # Opened here rather than by `send_messages()`, which closes the connections it opened itself. A no-op on
+            # an open connection, a connection closed after a failure is reopened.
+            connection.open()
+            yield connection
+        except Exception:
+            connection.close()
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def _create(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+
+        connection = get_connection(self.backend, **self.kwargs)
+        self._all.append(connection)
+        return connection
+
+    def close(self):
+        for connection in self._all:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BulkSendReport:
+    """ Outcome and throughput of a `send_bulk` run """
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """ Messages delivered per second """
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'batches': self.batches,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput, 1),
+        }
+
+
+def send_bulk(messages, batch_size=None, pool=None):
+    """
+    Send an iterable of `EmailMessage` in batches with `send_messages`, spreading the batches over the connections
+    of `pool`. Messages are consumed lazily, a batch per connection at most is held in memory.
+    """
+
+    batch_size = batch_size or settings.EMAIL_BULK_BATCH_SIZE
+    own_pool = pool is None
+    pool = pool or ConnectionPool()
+    report = BulkSendReport()
+
+    def send_batch(batch):
+        with pool.connection() as connection:
+            return connection.send_messages(batch) or 0
+
+    def record(batch, future):
+        report.batches += 1
+        try:
+            report.sent += future.result()
+        except Exception as e:
+            logger.warning('Failed to send a batch of %s email(s): %s', len(batch), e)
+            report.failed += len(batch)
+
+    start = time.perf_counter()
+    messages = iter(messages)
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            while batch := list(islice(messages, batch_size)):
+                pending.append((batch, executor.submit(send_batch, batch)))
+
+                # Bound the number of batches in flight to the number of connections
+                if len(pending) >= pool.size:
+                    record(*pending.pop(0))
+            for batch, future in pending:
+                record(batch, future)
+    finally:
+        if own_pool:
+            pool.close()
+
+    report.elapsed = time.perf_counter() - start
+    logger.info('Bulk email run finished: %s', report.as_dict())
+    return report
+
+
+def send_bulk_user_mail(users, build_mail, base_url, **kwargs):
+    """
+    Send `build_mail` (`verification_mail` or `password_reset_mail`) to every user of `users` with `send_bulk`.
+    """
+
+    def build_absolute_uri(path):
+        return base_url.rstrip('/') + path
+
+    messages = (
+        EmailMessage(*build_mail(user, build_absolute_uri), settings.EMAIL_HOST_USER, [user.email])
+        for user in users
+    )
+    return send_bulk(messages, **kwargs)
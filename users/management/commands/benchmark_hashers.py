@@ -0,0 +1,61 @@
+import time
+from importlib.util import find_spec
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from users.hashers import TunableArgon2PasswordHasher, TunablePBKDF2PasswordHasher
+
+PASSWORD = 'benchmark-password'
+
+# Hasher, tuned setting, rounding step and minimum. Both costs are linear in the tuned parameter: the PBKDF2 iteration
+# count, and the Argon2 memory cost for a given number of passes (kept above the RFC 9106 minimum of 19 MiB)
+TUNABLE_HASHERS = {
+    'PBKDF2': (TunablePBKDF2PasswordHasher, 'PASSWORD_PBKDF2_ITERATIONS', 10000, 10000),
+    'Argon2': (TunableArgon2PasswordHasher, 'PASSWORD_ARGON2_MEMORY_COST', 1024, 19456),
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure the password hashing cost on this machine and recommend the PBKDF2 iterations and the Argon2 '
+            'memory cost hashing a password in the given latency budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250, help='Hashing latency budget in milliseconds')
+        parser.add_argument('--samples', type=int, default=5, help='Number of hashes timed per hasher')
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        hashers = dict(TUNABLE_HASHERS)
+        if not find_spec('argon2'):
+            del hashers['Argon2']
+            self.stdout.write('Argon2: skipped, install argon2-cffi to benchmark it')
+
+        recommended = {}
+        for name, (hasher, setting, step, minimum) in hashers.items():
+            current = getattr(settings, setting)
+            elapsed = self.measure(hasher(), options['samples'])
+            self.report(name, setting, current, elapsed)
+            recommended[setting] = max(int(round(current * target / elapsed / step)) * step, minimum)
+
+        # Time the recommendation too, the cost is not perfectly linear with small parameters
+        self.stdout.write(f'\nRecommended settings for {options["target_ms"]:g} ms per hash:')
+        with override_settings(**recommended):
+            for name, (hasher, setting, step, minimum) in hashers.items():
+                self.report(name, setting, recommended[setting], self.measure(hasher(), options['samples']))
+
+    def measure(self, hasher, samples):
+        timings = []
+        for _ in range(max(samples, 1)):
+            salt = hasher.salt()
+            start = time.perf_counter()
+            hasher.encode(PASSWORD, salt)
+            timings.append(time.perf_counter() - start)
+        return median(timings)
+
+    def report(self, name, setting, value, elapsed):
+        self.stdout.write(
+            f'{setting}={value}  # {name}: {elapsed * 1000:.1f} ms per hash, {1 / elapsed:.1f} hashes/s per core'
+        )
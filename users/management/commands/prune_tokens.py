@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired outstanding and blacklisted tokens in small batches, without locking the tables for long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of tokens deleted per transaction')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # Read and delete on the primary, a queryset's own alias is the one it reads from
+        using = router.db_for_write(OutstandingToken)
+        expired = OutstandingToken.objects.using(using).filter(expires_at__lte=now)
+        expired = expired.order_by('id').values_list('id', flat=True)
+        outstanding = blacklisted = 0
+
+        while True:
+            ids = list(expired[:options['batch_size']])
+            if not ids:
+                break
+
+            with transaction.atomic(using=using):
+                blacklisted += BlacklistedToken.objects.using(using).filter(token_id__in=ids).delete()[0]
+                # The blacklist rows are gone already, skip the collector which would load every token to cascade
+                outstanding += OutstandingToken.objects.using(using).filter(id__in=ids)._raw_delete(using)
+
+        self.stdout.write(f'{outstanding} expired token(s) deleted, {blacklisted} of them blacklisted')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.mail import deliver_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver the emails waiting in the outbox, retrying failed deliveries with an exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of emails claimed at once')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting once drained')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+
+        try:
+            while True:
+                sent, failed = deliver_queued_mail(connection, batch_size=options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+
+                if sent or failed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(f'{total_sent} email(s) sent, {total_failed} failed attempt(s)')
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from users.mail import ConnectionPool, password_reset_mail, send_bulk_user_mail, verification_mail
+from users.models import CustomUser
+
+MAILS = {
+    'verification': verification_mail,
+    'password-reset': password_reset_mail,
+}
+
+
+class Command(BaseCommand):
+    help = 'Send verification or password reset emails to many users at once over a pool of SMTP connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(MAILS), help='Email to send')
+        parser.add_argument('--base-url', required=True, help='Scheme and host used in the links, e.g. https://example.com')
+        parser.add_argument('--inactive-only', action='store_true', help='Only email the users who are not active yet')
+        parser.add_argument('--batch-size', type=int, help='Messages sent per `send_messages` call')
+        parser.add_argument('--connections', type=int, help='Number of SMTP connections kept open')
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.only('pk', 'email', 'password', 'last_login').order_by('pk')
+        if options['inactive_only']:
+            users = users.filter(is_active=False)
+
+        with ConnectionPool(size=options['connections']) as pool:
+            report = send_bulk_user_mail(
+                users.iterator(chunk_size=2000),
+                MAILS[options['kind']],
+                options['base_url'],
+                batch_size=options['batch_size'],
+                pool=pool,
+            )
+
+        self.stdout.write(json.dumps(report.as_dict()))
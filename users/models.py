@@ -1,6 +1,8 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class CustomUserManager(BaseUserManager):
@@ -27,6 +29,24 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, is_active=True, **extra_fields)
 
+    def get_by_email(self, email):
+        """
+        Case-insensitive email lookup. The exact match wins, looked up through the unique index, otherwise the
+        `Lower('email')` index is searched and a single account must match, several accounts differing only by the
+        case of their email are ambiguous.
+        """
+
+        if not email or not isinstance(email, str):
+            raise self.model.DoesNotExist
+        try:
+            return self.get(email=email)
+        except self.model.DoesNotExist:
+            pass
+        users = list(self.alias(email_lower=Lower('email')).filter(email_lower=email.lower())[:2])
+        if len(users) != 1:
+            raise self.model.DoesNotExist
+        return users[0]
+
 
 class CustomUser(AbstractUser):
     username = None
@@ -36,4 +56,41 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
-    objects = CustomUserManager()
\ No newline at end of file
+    objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+        ]
+
+
+class OutboundEmail(models.Model):
+    """ An email waiting in the outbox, delivered by the `send_queued_mail` worker """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)}'
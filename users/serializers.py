@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
 from .models import CustomUser
+from .tokens import FastBlacklistRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,3 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         return CustomUser.objects.create_user(**validated_data)
+
+
+class FastBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FastBlacklistRefreshToken
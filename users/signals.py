@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .models import CustomUser
+
+
+@receiver((post_save, post_delete), sender=CustomUser, dispatch_uid='users.evict_cached_user')
+def evict_cached_user(sender, instance, **kwargs):
+    # Deactivations and password changes must be seen by the next authenticated request. `QuerySet.update()` sends
+    # no signal, users deactivated that way stay cached for up to `JWT_AUTH_CACHE_TTL` seconds
+    user_cache.delete(instance.pk)
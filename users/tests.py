@@ -1,17 +1,41 @@
+import copy
+import json
+import pickle
+import smtplib
+import threading
 from datetime import timedelta, datetime
+from io import StringIO
+from unittest import mock
 
 import jwt
 from django.contrib.auth.tokens import default_token_generator
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import CustomUser
+from config.testing import QueryBudgetMixin, QueryPlanMixin
+from . import async_views, blacklist, factories, hashers
+from .authentication import CachedJWTAuthentication, token_cache, user_cache
+from .mail import ConnectionPool, send_bulk
+from .models import CustomUser, OutboundEmail
+from .throttling import IPThrottle, SlidingWindowThrottle
+from .tokens import FastBlacklistRefreshToken
 
 
 def generate_expired_token(user):
@@ -28,8 +52,16 @@ def generate_expired_token(user):
     return expired_token
 
 
+class FailingEmailBackend(BaseEmailBackend):
+    """ Email backend simulating an unreachable SMTP relay """
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP relay unreachable')
+
+
 class Tests(TestCase):
     def setUp(self):
+        cache.clear()  # Throttling counters
         self.client = APIClient()
 
         self.active_user_data = {'email': 'active@example.com', 'password': 'active123'}
@@ -284,3 +316,530 @@ class LogoutTests(Tests):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
         response = self.client.post(self.logout_url, {'refresh': refresh_token})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MailQueueTests(Tests):
+
+    def setUp(self):
+        super().setUp()
+        self.signup_url = reverse('signup-view')
+        self.password_reset_request_url = reverse('password-reset-request-view')
+
+
+    def test_emails_are_queued_then_delivered(self):
+        """ Test the views only queue their emails and the worker delivers them """
+
+        self.client.post(self.signup_url, self.nonexistent_user_data)
+        self.client.post(self.password_reset_request_url, {'email': self.active_user_data['email']})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 2)
+
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox), ['Reset Your Password', 'Verify Your Email Address']
+        )
+        self.assertEqual(mail.outbox[0].to, [self.nonexistent_user_data['email']])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+
+    @override_settings(EMAIL_BACKEND='users.tests.FailingEmailBackend', EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_failed_deliveries_are_retried_with_backoff(self):
+        """ Test a failed delivery is rescheduled, then given up on after the maximum number of attempts """
+
+        self.client.post(self.password_reset_request_url, {'email': self.active_user_data['email']})
+
+        call_command('send_queued_mail', stdout=StringIO())
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, email.created_at + timedelta(seconds=20))
+        self.assertEqual(email.last_error, 'SMTP relay unreachable')
+
+        # Make the email due again
+        OutboundEmail.objects.update(next_attempt_at=email.created_at)
+        call_command('send_queued_mail', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, 2)
+
+
+class BulkMailTests(Tests):
+
+    def test_send_bulk_reuses_pooled_connections(self):
+        """ Test bulk sending delivers every message in batches over at most `size` connections """
+
+        messages = (EmailMessage(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com']) for i in range(25))
+        with ConnectionPool(size=2) as pool:
+            report = send_bulk(messages, batch_size=10, pool=pool)
+
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual((report.sent, report.failed, report.batches), (25, 0, 3))
+        self.assertLessEqual(pool._created, 2)
+        self.assertGreater(report.throughput, 0)
+
+
+    @override_settings(EMAIL_BACKEND='users.tests.FailingEmailBackend')
+    def test_send_bulk_reports_failed_batches(self):
+        """ Test a failing relay is reported in the metrics instead of aborting the run """
+
+        messages = [EmailMessage('Subject', 'Body', 'from@example.com', ['to@example.com']) for _ in range(5)]
+        with self.assertLogs('users.mail', 'WARNING'):
+            report = send_bulk(messages, batch_size=2)
+        self.assertEqual((report.sent, report.failed, report.batches), (0, 5, 3))
+
+
+    def test_send_bulk_keeps_smtp_connections_open(self):
+        """ Test the pooled SMTP connections are opened once each, and reopened after a failure only """
+
+        messages = (EmailMessage(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com']) for i in range(1000))
+        with mock.patch('django.core.mail.backends.smtp.smtplib.SMTP') as smtp:
+            smtp.return_value.sendmail.side_effect = [smtplib.SMTPServerDisconnected()] + [{}] * 999
+            pool = ConnectionPool(
+                size=2, backend='django.core.mail.backends.smtp.EmailBackend', use_tls=False, username='', password=''
+            )
+            with pool, self.assertLogs('users.mail', 'WARNING'):
+                report = send_bulk(messages, batch_size=10, pool=pool)
+
+        self.assertEqual((report.sent, report.failed, report.batches), (990, 10, 100))
+        self.assertEqual(smtp.call_count, 3)
+
+
+    def test_send_user_mail_command(self):
+        """ Test sending verification emails to every inactive user with working links """
+
+        out = StringIO()
+        call_command('send_user_mail', 'verification', '--base-url', 'http://testserver', '--inactive-only', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.inactive_user.email])
+
+        link = mail.outbox[0].body.split(': ')[-1]
+        response = self.client.get(link)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CachedAuthenticationTests(Tests):
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        user_cache.clear()
+
+        access_token = RefreshToken.for_user(self.active_user).access_token
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+
+    def test_authentication_is_cached(self):
+        """ Test only the first authentication of a token hits the database """
+
+        user, _ = CachedJWTAuthentication().authenticate(self.request)
+        self.assertEqual((user.pk, user.email, user.is_active), (self.active_user.pk, self.active_user.email, True))
+
+        with self.assertNumQueries(0):
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+        self.assertEqual(user, self.active_user)
+        self.assertFalse(user.is_staff)
+
+        # Attributes outside of the snapshot load the full user
+        with self.assertNumQueries(1):
+            self.assertEqual(user.get_username(), self.active_user.email)
+
+
+    def test_snapshot_can_be_copied_and_pickled(self):
+        """ Test copying or pickling a cached user does not recurse into the lazy lookup """
+
+        user, _ = CachedJWTAuthentication().authenticate(self.request)
+        with self.assertNumQueries(0):
+            for clone in (copy.copy(user), copy.deepcopy(user), pickle.loads(pickle.dumps(user))):
+                self.assertEqual((clone.pk, clone.email), (self.active_user.pk, self.active_user.email))
+        with self.assertRaises(AttributeError):
+            user._missing
+
+
+    def test_deactivation_and_password_change_evict_the_user(self):
+        """ Test a cached user is re-read once deactivated or after a password change """
+
+        CachedJWTAuthentication().authenticate(self.request)
+
+        self.active_user.set_password('new-password')
+        self.active_user.save()
+        with self.assertNumQueries(1):
+            CachedJWTAuthentication().authenticate(self.request)
+
+        self.active_user.is_active = False
+        self.active_user.save()
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(self.request)
+
+
+    def test_protected_view_with_cached_authentication(self):
+        """ Test a protected view accepts a cached user and rejects it once deactivated """
+
+        url = reverse('dummy-objects-protected-view')
+        self.client.credentials(HTTP_AUTHORIZATION=self.request.META['HTTP_AUTHORIZATION'])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.active_user.is_active = False
+        self.active_user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(JWT_BLACKLIST_FAST_CHECK=True)
+class BlacklistTests(Tests):
+
+    def setUp(self):
+        super().setUp()
+        blacklist.index = blacklist.BlacklistIndex()
+
+        self.refresh_url = reverse('token_refresh')
+        self.refresh = FastBlacklistRefreshToken.for_user(self.active_user)
+
+
+    def test_refresh_does_not_query_the_blacklist(self):
+        """ Test a token missing from the index is accepted without a blacklist query """
+
+        FastBlacklistRefreshToken(str(self.refresh))
+        with self.assertNumQueries(0):
+            FastBlacklistRefreshToken(str(self.refresh))
+
+        response = self.client.post(self.refresh_url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+
+    def test_blacklisted_token_is_rejected_by_every_process(self):
+        """ Test a blacklisted token is rejected, including by an index synced before it was blacklisted """
+
+        other_process = blacklist.BlacklistIndex()
+        self.assertFalse(other_process.might_contain(str(self.refresh['jti'])))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('logout-view'), {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+
+        self.assertTrue(other_process.might_contain(str(self.refresh['jti'])))
+        response = self.client.post(self.refresh_url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+    def test_rows_committed_out_of_id_order_are_synced(self):
+        """ Test a blacklisted token is picked up whatever the order of the ids and of the commits """
+
+        other_process = blacklist.BlacklistIndex()
+        other_process.sync()
+        tokens = [FastBlacklistRefreshToken.for_user(self.active_user) for _ in range(2)]
+        outstanding = dict(
+            OutstandingToken.objects.filter(jti__in=[token['jti'] for token in tokens]).values_list('jti', 'id')
+        )
+
+        # The higher id commits and is synced first
+        BlacklistedToken.objects.create(id=100, token_id=outstanding[tokens[1]['jti']])
+        blacklist.index.publish(tokens[1]['jti'])
+        self.assertTrue(other_process.might_contain(tokens[1]['jti']))
+
+        BlacklistedToken.objects.create(id=50, token_id=outstanding[tokens[0]['jti']])
+        blacklist.index.publish(tokens[0]['jti'])
+        with self.assertNumQueries(0):
+            self.assertTrue(other_process.might_contain(tokens[0]['jti']))
+
+        # A generation bumped but not written yet falls back to the database
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+        cache.incr(blacklist.GENERATION_KEY)
+        self.assertTrue(other_process.might_contain(self.refresh['jti']))
+
+
+    def test_lost_generation_resyncs_the_index(self):
+        """ Test the index reloads from the database when the shared generation was evicted """
+
+        blacklist.index.sync()
+        token = OutstandingToken.objects.get(jti=self.refresh['jti'])
+        BlacklistedToken.objects.create(token=token)
+        cache.clear()
+
+        self.assertTrue(blacklist.is_blacklisted(self.refresh['jti']))
+
+
+    def test_prune_tokens(self):
+        """ Test only the expired tokens are pruned, blacklisted or not """
+
+        FastBlacklistRefreshToken.for_user(self.active_user).blacklist()
+        expired = [FastBlacklistRefreshToken.for_user(self.active_user) for _ in range(3)]
+        expired[0].blacklist()
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in expired]).update(expires_at=timezone.now())
+
+        out = StringIO()
+        call_command('prune_tokens', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(out.getvalue().strip(), '3 expired token(s) deleted, 1 of them blacklisted')
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class PasswordHashingTests(Tests):
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_login_rehashes_password(self):
+        """ Test a password hashed with other parameters is rehashed on the next login """
+
+        self.assertNotIn('$1000$', self.active_user.password)
+
+        response = self.client.post(reverse('login-view'), self.active_user_data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.active_user.refresh_from_db()
+        self.assertTrue(self.active_user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.active_user.check_password(self.active_user_data['password']))
+
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_benchmark_hashers(self):
+        """ Test the benchmark recommends a PBKDF2 iteration count for the latency budget """
+
+        out = StringIO()
+        call_command('benchmark_hashers', '--target-ms', '1', '--samples', '1', stdout=out)
+
+        recommendations = out.getvalue().split('Recommended settings for 1 ms per hash:')[1]
+        self.assertRegex(recommendations, r'PASSWORD_PBKDF2_ITERATIONS=\d+0000  # PBKDF2: ')
+
+
+class AsyncViewsTests(Tests):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+
+
+    async def test_async_login(self):
+        """ Test the async login returns tokens for valid credentials only """
+
+        response = await async_views.login(self.factory.post('/', self.active_user_data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(json.loads(response.content)), {'refresh', 'access'})
+
+        for data in (self.inactive_user_data, self.nonexistent_user_data, {**self.active_user_data, 'password': 'x'}):
+            response = await async_views.login(self.factory.post('/', data, content_type='application/json'))
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+    async def test_async_signup(self):
+        """ Test the async signup creates the user and queues the verification email """
+
+        response = await async_views.signup(self.factory.post('/', {'email': 'new@example.com', 'password': 'new123'}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        user = await CustomUser.objects.aget(email='new@example.com')
+        self.assertTrue(user.check_password('new123'))
+        self.assertFalse(user.is_active)
+        self.assertTrue(await OutboundEmail.objects.filter(recipients=['new@example.com']).aexists())
+
+        response = await async_views.signup(self.factory.post('/', {'email': 'new@example.com', 'password': 'new123'}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    async def test_async_password_reset_confirm(self):
+        """ Test the async password reset confirmation updates the password """
+
+        uid = urlsafe_base64_encode(force_bytes(self.active_user.pk))
+        token = default_token_generator.make_token(self.active_user)
+
+        response = await async_views.password_reset_confirm(self.factory.post('/', {'password': 'reset123'}), uid, token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user = await CustomUser.objects.aget(pk=self.active_user.pk)
+        self.assertTrue(user.check_password('reset123'))
+
+        response = await async_views.password_reset_confirm(self.factory.post('/', {'password': 'again'}), uid, token)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    async def test_saturated_pool_returns_503(self):
+        """ Test the async views apply backpressure once the hashing pool is full """
+
+        pool = hashers.BoundedExecutor(max_workers=1, queue_size=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+
+        try:
+            with mock.patch.object(hashers, 'hashing_pool', pool):
+                response = await async_views.login(self.factory.post('/', self.active_user_data))
+        finally:
+            release.set()
+            pool.shutdown()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class ThrottlingTests(Tests):
+
+    def setUp(self):
+        super().setUp()
+        self.rates = mock.patch.dict(drf_settings.DEFAULT_THROTTLE_RATES, {'login_ip': '5/min', 'login_email': '2/min'})
+        self.rates.start()
+        self.addCleanup(self.rates.stop)
+        # A fixed clock, a test crossing the end of a window would see its hits fade
+        timer = mock.patch.object(SlidingWindowThrottle, 'timer', lambda _: 6030.0)
+        timer.start()
+        self.addCleanup(timer.stop)
+
+
+    def test_login_throttled_per_email(self):
+        """ Test the login attempts on an email are throttled before any database lookup """
+
+        wrong_password = {**self.active_user_data, 'password': 'wrong'}
+        for _ in range(2):
+            response = self.client.post(reverse('login-view'), wrong_password)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('login-view'), self.active_user_data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+
+        # The other emails are only limited by the per address rate
+        response = self.client.post(reverse('login-view'), self.inactive_user_data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+    def test_login_throttled_per_address(self):
+        """ Test the login attempts from an address are throttled whatever the email """
+
+        for i in range(5):
+            self.client.post(reverse('login-view'), {'email': f'user{i}@example.com', 'password': 'x'})
+
+        response = self.client.post(reverse('login-view'), self.active_user_data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(reverse('login-view'), self.active_user_data, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+    def test_sliding_window(self):
+        """ Test the hits of the previous window count in proportion of its overlap with the sliding window """
+
+        throttle = IPThrottle()
+        view = type('View', (), {'throttle_scope': 'login'})
+        request = APIRequestFactory().post('/')
+        now = 6000.0
+
+        with mock.patch.object(IPThrottle, 'timer', lambda _: now):
+            self.assertEqual(sum(throttle.allow_request(request, view) for _ in range(6)), 5)
+
+            # Half of the previous window overlaps: 2.5 of its 5 hits still count
+            now += 90
+            self.assertEqual(sum(throttle.allow_request(request, view) for _ in range(5)), 3)
+            # 5 * (1 - (30 + t) / 60) + 3 < 5 once t > 6
+            self.assertAlmostEqual(throttle.wait(), 6)
+
+            now += 60
+            self.assertTrue(throttle.allow_request(request, view))
+
+
+    def test_concurrent_requests_do_not_exceed_the_limit(self):
+        """ Test requests checked at the same time are not all let through on the same count """
+
+        view = type('View', (), {'throttle_scope': 'login'})
+        request = APIRequestFactory().post('/')
+        barrier = threading.Barrier(10)
+        # Each thread has its own cache connection, the backend class is patched
+        backend = type(caches['default'])
+        get_many = backend.get_many
+
+        def read_together(self, keys, **kwargs):
+            counts = get_many(self, keys, **kwargs)
+            barrier.wait(timeout=5)
+            return counts
+
+        allowed = []
+        with mock.patch.object(backend, 'get_many', read_together):
+            threads = [
+                threading.Thread(target=lambda: allowed.append(IPThrottle().allow_request(request, view)))
+                for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sum(allowed), 5)
+        self.assertFalse(IPThrottle().allow_request(request, view))
+
+
+    async def test_async_login_throttled(self):
+        """ Test the async login shares the throttles of the DRF one """
+
+        factory = AsyncRequestFactory()
+        for _ in range(2):
+            await async_views.login(factory.post('/', self.nonexistent_user_data))
+
+        response = await async_views.login(factory.post('/', self.nonexistent_user_data))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+
+class QueryBudgetTests(QueryBudgetMixin, Tests):
+
+    def test_auth_endpoints_query_budgets(self):
+        """ Test the authentication endpoints stay within their query budget """
+
+        with self.assertQueryBudget('signup-view'):
+            response = self.client.post(reverse('signup-view'), {'email': 'new@example.com', 'password': 'new123'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with self.assertQueryBudget('login-view'):
+            response = self.client.post(reverse('login-view'), self.active_user_data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertQueryBudget('password-reset-request-view'):
+            response = self.client.post(reverse('password-reset-request-view'), {'email': self.active_user.email})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class FactoryTests(Tests):
+    def test_create_users(self):
+        """ Test seeded users share a single hash and can log in """
+
+        self.assertEqual(factories.create_users(5, chunk_size=2, password='seeded-password'), 5)
+
+        users = CustomUser.objects.filter(email__startswith='user')
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(users.values('password').distinct().count(), 1)
+        self.assertTrue(all(user.is_active for user in users))
+
+        response = self.client.post(reverse('login-view'), {'email': 'user4@example.com', 'password': 'seeded-password'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class EmailLookupTests(QueryPlanMixin, Tests):
+    def test_get_by_email(self):
+        """ Test the email lookup ignores the case and prefers an exact match """
+
+        user = CustomUser.objects.get(email=self.active_user_data['email'])
+        self.assertEqual(CustomUser.objects.get_by_email('ACTIVE@example.com'), user)
+
+        other = CustomUser.objects.create_user('Active@example.com', 'password')
+        self.assertEqual(CustomUser.objects.get_by_email('Active@example.com'), other)
+        self.assertEqual(CustomUser.objects.get_by_email('active@example.com'), user)
+        for email in ('ACTIVE@example.com', 'unknown@example.com', None, 42):
+            with self.assertRaises(CustomUser.DoesNotExist):
+                CustomUser.objects.get_by_email(email)
+
+        # The exact match is found however many accounts share the email in another case
+        third = CustomUser.objects.create_user('aCTIVE@example.com', 'password')
+        self.assertEqual(CustomUser.objects.get_by_email('aCTIVE@example.com'), third)
+        with self.assertNumQueries(1):
+            self.assertEqual(CustomUser.objects.get_by_email('Active@example.com'), other)
+
+    def test_password_reset_request_case_insensitive(self):
+        """ Test password reset request with a differently cased email """
+
+        response = self.client.post(reverse('password-reset-request-view'), {'email': 'Active@Example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_email_lookup_uses_index(self):
+        """ Test the case-insensitive lookup is served by the functional index """
+
+        with CaptureQueriesContext(connection) as context:
+            CustomUser.objects.get_by_email('ACTIVE@example.com')
+        # The exact lookup misses, the case-insensitive one follows
+        self.assertUsesIndex(context.captured_queries[-1]['sql'], 'users_email_lower_idx')
@@ -0,0 +1,136 @@
+from hashlib import md5
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding window rate limit approximated from two fixed windows, as popularised by Cloudflare.
+
+    Each identity only costs two integers in the cache (the hits of the current and of the previous window), where
+    DRF's `SimpleRateThrottle` stores the timestamp of every request. The hits of the previous window are weighted
+    by how much of it still overlaps the sliding window. A rejection reads both counters in a single `get_many()` and
+    writes nothing. An allowed request is counted with the atomic `add()` / `incr()` and checked again against the
+    count it got back, concurrent requests each get their own so no more than the limit are let through.
+
+    Like DRF's `ScopedRateThrottle`, the scope comes from the view (`throttle_scope`), suffixed with `scope_suffix`,
+    and the rate from `DEFAULT_THROTTLE_RATES`. A view without a rate for the scope is not throttled.
+    """
+
+    scope_suffix = None
+    cache_format = 'throttle:%(scope)s:%(ident)s:%(window)d'
+
+    def __init__(self):
+        # The scope depends on the view, the rate is read in `allow_request()`
+        pass
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_identity(self, request):
+        raise NotImplementedError('.get_identity() must be overridden')
+
+    def allow_request(self, request, view):
+        self.scope = f'{getattr(view, "throttle_scope", None)}_{self.scope_suffix}'
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+
+        identity = self.get_identity(request)
+        if identity is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return self.hit(identity)
+
+    def hit(self, identity):
+        """ Count a request of `identity`, unless it is over the limit: then remember the wait and return False """
+
+        self.now = self.timer()
+        window, elapsed = divmod(self.now, self.duration)
+        current, previous = (
+            self.cache_format % {'scope': self.scope, 'ident': identity, 'window': window - offset}
+            for offset in (0, 1)
+        )
+
+        counts = self.cache.get_many([current, previous])
+        hits, previous_hits = counts.get(current, 0), counts.get(previous, 0)
+        overlap = previous_hits * (1 - elapsed / self.duration)
+        if overlap + hits < self.num_requests:
+            # The hits read above may be outdated by now, the request is allowed on the count it gets
+            hits = self.increment(current) - 1
+            if overlap + hits < self.num_requests:
+                return True
+            # Beaten by concurrent requests, this one is not counted after all
+            try:
+                self.cache.decr(current)
+            except ValueError:
+                pass
+
+        self._wait = self.compute_wait(hits, previous_hits, elapsed)
+        return False
+
+    def increment(self, key):
+        """ Add a hit to the counter `key`, returns the new count """
+
+        # Each counter is read for two windows
+        if self.cache.add(key, 1, self.duration * 2):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired in between
+            self.cache.set(key, 1, self.duration * 2)
+            return 1
+
+    def compute_wait(self, hits, previous_hits, elapsed):
+        if hits >= self.num_requests or not previous_hits:
+            return self.duration - elapsed
+        # Time for the previous window to fade below the remaining allowance
+        return max((1 - (self.num_requests - hits) / previous_hits) * self.duration - elapsed, 0)
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """ Limit the requests per client address, see `SimpleRateThrottle.get_ident()` for the proxies handling """
+
+    scope_suffix = 'ip'
+
+    def get_identity(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """ Limit the requests targeting an email address, whatever the client address """
+
+    scope_suffix = 'email'
+
+    def get_identity(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        # Hashed to keep the cache keys short and free of the characters memcached rejects
+        return md5(email.strip().lower().encode(), usedforsecurity=False).hexdigest()
+
+
+def throttle_wait(request, scope, data, throttle_classes=(IPThrottle, EmailThrottle)):
+    """
+    Throttle a request outside of DRF, `data` being its parsed body: return the seconds to wait before it is allowed
+    under the `scope` rates, or None if it is allowed now
+    """
+
+    request = SimpleNamespace(META=request.META, data=data)
+    view = SimpleNamespace(throttle_scope=scope)
+    throttles = [cls() for cls in throttle_classes]
+    waits = [throttle.wait() for throttle in throttles if not throttle.allow_request(request, view)]
+    return max(waits) if waits else None
+
+
+async def athrottle_wait(request, scope, data, throttle_classes=(IPThrottle, EmailThrottle)):
+    """ `throttle_wait()` for async callers, the cache calls block so they run in a thread """
+
+    return await sync_to_async(throttle_wait)(request, scope, data, throttle_classes)
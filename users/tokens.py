@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import blacklist
+
+
+class FastBlacklistRefreshToken(RefreshToken):
+    """ `RefreshToken` checking the blacklist through `users.blacklist` instead of a query per check """
+
+    def check_blacklist(self):
+        if blacklist.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        jti = self.payload[api_settings.JTI_CLAIM]
+        blacklist.index.add(jti)
+        # Published once committed, a process rebuilding its index before that would miss the row
+        transaction.on_commit(lambda: blacklist.index.publish(jti))
+        return result
@@ -1,12 +1,22 @@
+from django.conf import settings
 from django.urls import path
+
+from . import async_views
 from .views import SignupView, LoginView, LogoutView, EmailVerificationView, PasswordResetRequestView, \
     PasswordResetConfirmView
 
+if settings.USERS_ASYNC_VIEWS:
+    signup_view, login_view, password_reset_confirm_view = \
+        async_views.signup, async_views.login, async_views.password_reset_confirm
+else:
+    signup_view, login_view, password_reset_confirm_view = \
+        SignupView.as_view(), LoginView.as_view(), PasswordResetConfirmView.as_view()
+
 urlpatterns = [
-    path('signup/', SignupView.as_view(), name='signup-view'),
-    path('login/', LoginView.as_view(), name='login-view'),
+    path('signup/', signup_view, name='signup-view'),
+    path('login/', login_view, name='login-view'),
     path('logout/', LogoutView.as_view(), name='logout-view'),
     path('email-verification/<str:uidb64>/<str:token>/', EmailVerificationView.as_view(), name='email-verification-view'),
     path('password-reset-request/', PasswordResetRequestView.as_view(), name='password-reset-request-view'),
-    path('password-reset-confirm/<str:uidb64>/<str:token>/', PasswordResetConfirmView.as_view(), name='password-reset-confirm-view'),
+    path('password-reset-confirm/<str:uidb64>/<str:token>/', password_reset_confirm_view, name='password-reset-confirm-view'),
 ]
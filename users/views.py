@@ -1,43 +1,33 @@
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.urls import reverse
-from django.utils.encoding import force_bytes, force_str
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .mail import enqueue_mail, password_reset_mail, verification_mail
 from .models import CustomUser
 from .serializers import UserSerializer
+from .throttling import EmailThrottle, IPThrottle
+from .tokens import FastBlacklistRefreshToken
 
 
 class SignupView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle,)
+    throttle_scope = 'signup'
 
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
 
-            # Generate email verification token and link
-            token = default_token_generator.make_token(user)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            verification_link = request.build_absolute_uri(
-                reverse('email-verification-view', kwargs={'uidb64': uid, 'token': token})
-            )
-
-            # Send verification email
-            send_mail(
-                "Verify Your Email Address",
-                f"Click the link to verify your email: {verification_link}",
-                settings.EMAIL_HOST_USER,
-                [user.email],
-                fail_silently=False,
-            )
+            # Queue the verification email
+            subject, message = verification_mail(user, request.build_absolute_uri)
+            enqueue_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
 
             return Response({
                 "message": "User created. Please check your email to verify your account."
@@ -67,13 +57,15 @@ class EmailVerificationView(APIView):
 
 class LoginView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'login'
 
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
         user = authenticate(email=email, password=password)
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = FastBlacklistRefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -83,37 +75,29 @@ class LoginView(APIView):
 
 class PasswordResetRequestView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, EmailThrottle)
+    throttle_scope = 'password_reset'
 
     def post(self, request):
 
         # Check the existence of the user
         email = request.data.get('email')
         try:
-            user = CustomUser.objects.get(email=email)
+            user = CustomUser.objects.get_by_email(email)
         except CustomUser.DoesNotExist:
             return Response({"error": "Invalid email."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Generate reset token and link
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        reset_link = request.build_absolute_uri(
-            reverse('password-reset-confirm-view', kwargs={'uidb64': uid, 'token': token})
-        )
-
-        # Send reset email
-        send_mail(
-            "Reset Your Password",
-            f"Click the link to reset your password: {reset_link}",
-            settings.EMAIL_HOST_USER,
-            [user.email],
-            fail_silently=False,
-        )
+        # Queue the reset email
+        subject, message = password_reset_mail(user, request.build_absolute_uri)
+        enqueue_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
 
         return Response({"message": "Password reset email sent."}, status=status.HTTP_200_OK)
 
 
 class PasswordResetConfirmView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle,)
+    throttle_scope = 'password_reset_confirm'
 
     def post(self, request, uidb64, token):
 
@@ -146,7 +130,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh')
-            token = RefreshToken(refresh_token)
+            token = FastBlacklistRefreshToken(refresh_token)
             token.blacklist()
             return Response({"message": "Logged out successfully"}, status=status.HTTP_205_RESET_CONTENT)
         except Exception as e: